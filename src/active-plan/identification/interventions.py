@@ -7,7 +7,43 @@ using the StateManager to update positions and infer relationships.
 Author: Yazz Warsame
 """
 
-from state_manager import StateManager
+import logging
+import re
+from functools import lru_cache
+
+from state_manager import Direction, StateManager
+
+
+log = logging.getLogger(__name__)
+
+# Direction tokens accepted by shift actions
+_DIRECTIONS = {d.name.lower(): d for d in Direction}
+
+# Canonical shift action: 'direction,magnitude' with a decimal magnitude
+_SHIFT_RE = re.compile(r'(left|right|forward|back),([0-9.eE+-]+)')
+
+# Maximum number of resolved (obj, action) pairs kept per applier
+_APPLY_CACHE_SIZE = 10_000
+
+# Shared (success, reward_delta) results for failed interventions and for
+# shifts applied with a zero shift reward
+_FAIL = (False, 0.0)
+_SHIFTED = (True, 0.0)
+
+
+@lru_cache(maxsize=512)
+def _parse_action(action):
+    """Memoized implementation of InterventionApplier.parse_action."""
+    m = _SHIFT_RE.fullmatch(action)
+    if m is None:
+        return None, None
+    
+    try:
+        magnitude = float(m.group(2))
+    except ValueError:
+        return None, None
+    
+    return _DIRECTIONS[m.group(1)], magnitude
 
 
 class InterventionApplier:
@@ -21,6 +57,8 @@ class InterventionApplier:
         shift_reward: Reward bonus for successful shifts (currently unused).
     """
     
+    __slots__ = ('state_manager', '_shift_reward', '_dispatch', '_apply_cache', '_obj_ids')
+    
     def __init__(self, state_manager, shift_reward):
         """Initialize the intervention applier.
         
@@ -29,45 +67,77 @@ class InterventionApplier:
             shift_reward: Reward bonus for successful shifts (default: 0.0).
         """
         self.state_manager = state_manager
+        
+        # Action kind (token before the first ',' or '-') -> handler;
+        # _resolve() binds the arguments each handler is called with
+        self._dispatch = {name: self._apply_shift for name in _DIRECTIONS}
+        self._dispatch['pick'] = self._apply_pick_place
+        self._dispatch['place'] = self._apply_pick_place
+        
+        # (obj, action) -> (handler, args), filled lazily by apply()
+        self._apply_cache = {}
+        
+        # Object name -> StateManager integer id, filled lazily by resolve_obj()
+        self._obj_ids = {}
+        
         self.shift_reward = shift_reward
     
+    @property
+    def shift_reward(self):
+        """Reward bonus for successful shifts."""
+        return self._shift_reward
+    
+    @shift_reward.setter
+    def shift_reward(self, value):
+        # Cached shift handlers are specialized on the reward value
+        if value != getattr(self, '_shift_reward', None):
+            self._apply_cache.clear()
+        self._shift_reward = value
+    
+    def resolve_obj(self, obj):
+        """Resolve an object name to its StateManager integer id.
+        
+        Args:
+            obj: Name of the object (e.g., '1').
+            
+        Returns:
+            Integer id if the object exists in the state, None otherwise.
+        """
+        try:
+            return self._obj_ids[obj]
+        except KeyError:
+            oid = self._obj_ids[obj] = self.state_manager.object_id(obj)
+            return oid
+    
     def parse_action(self, action):
         """Parse an action string into direction and magnitude.
         
+        Actions are expected in the canonical 'direction,magnitude' form used
+        by the scenario configs (no whitespace around the direction).
+        
         Args:
             action: Action string (e.g., 'left,0.005', 'right,0.01').
             
         Returns:
-            Tuple of (direction, magnitude), or (None, None) if parsing fails.
+            Tuple of (direction, magnitude) where direction is a Direction
+            member, or (None, None) if parsing fails.
             
         Examples:
             >>> parse_action('left,0.005')
-            ('left', 0.005)
+            (<Direction.LEFT: 0>, 0.005)
             >>> parse_action('forward,0.02')
-            ('forward', 0.02)
+            (<Direction.FORWARD: 2>, 0.02)
         """
-        try:
-            parts = action.split(',')
-            if len(parts) != 2:
-                return None, None
-            
-            direction = parts[0].strip()
-            magnitude = float(parts[1].strip())
-            
-            # Validate direction
-            valid_directions = {'left', 'right', 'forward', 'back'}
-            if direction not in valid_directions:
-                return None, None
-            
-            return direction, magnitude
-            
-        except (ValueError, AttributeError):
-            return None, None
+        return _parse_action(action)
     
     def apply(self, obj, action) :
         """Apply an intervention to an object.
         
         Parses the action and applies it to the object via the StateManager.
+        The action kind is read once from the token before the first comma
+        (or before the first '-' for pick/place verbs) and dispatched through
+        a lookup table, so the action string is scanned a single time. The
+        resolved handler is cached per (obj, action) pair.
         
         Args:
             obj: Name of the object to intervene on (e.g., '1', '2', '3').
@@ -78,75 +148,184 @@ class InterventionApplier:
                 - success: True if intervention was successfully applied
                 - reward_delta: Immediate reward from this intervention
         """
-        # Handle shift actions
-        if ',' in action and any(d in action for d in ['left', 'right', 'forward', 'back']):
-            return self._apply_shift(obj, action)
+        key = (obj, action)
+        entry = self._apply_cache.get(key)
         
-        # Handle swap actions (for future scenarios)
-        if obj == "Swap" and ',' in action:
-            return self._apply_swap(action)
+        if entry is None:
+            entry = self._resolve(obj, action)
+            
+            # FIFO eviction keeps the cache bounded for large action spaces
+            if len(self._apply_cache) >= _APPLY_CACHE_SIZE:
+                del self._apply_cache[next(iter(self._apply_cache))]
+            self._apply_cache[key] = entry
+        
+        handler, args = entry
+        return handler(*args)
+    
+    def apply_batch(self, interventions):
+        """Apply a sequence of interventions in order.
+        
+        Equivalent to calling apply() for each pair, with the cache and
+        resolution lookups hoisted out of the per-intervention call.
+        
+        Args:
+            interventions: Iterable of (object, action) tuples.
+            
+        Returns:
+            List of (success, reward_delta) tuples, one per intervention.
+        """
+        cache = self._apply_cache
+        results = []
         
-        # Handle pick/place actions (for future scenarios)
-        if 'pick' in action or 'place' in action:
-            return self._apply_pick_place(obj, action)
+        for key in interventions:
+            entry = cache.get(key)
+            if entry is None:
+                # Fall back to apply() so eviction is handled in one place
+                results.append(self.apply(*key))
+                continue
+            handler, args = entry
+            results.append(handler(*args))
         
-        # Unknown action type
-        print(f"[InterventionApplier] Unknown action type: {action}")
-        return False, 0.0
+        return results
     
-    def _apply_shift(self, obj, action):
-        """Apply a directional shift intervention.
+    def _resolve(self, obj, action):
+        """Resolve an intervention to its handler and handler arguments.
+        
+        Resolution only depends on the (obj, action) pair, never on the
+        current state, so apply() memoizes the result.
         
         Args:
-            obj: Name of the object to shift.
+            obj: Name of the object to intervene on.
             action: Action string (e.g., 'left,0.005').
             
+        Returns:
+            Tuple of (handler, args) such that handler(*args) applies the action.
+        """
+        head, sep, tail = action.partition(',')
+        
+        # Handle shift and pick/place actions
+        handler = self._dispatch.get(head.partition('-')[0])
+        if handler == self._apply_shift:
+            direction, magnitude = _parse_action(action)
+            if direction is None:
+                return self._apply_malformed, (action,)
+            
+            oid = self.resolve_obj(obj)
+            if oid is None:
+                return self._apply_missing, (obj,)
+            
+            if self._shift_reward == 0.0:
+                handler = self._apply_shift_no_reward
+            return handler, (oid, direction, magnitude)
+        if handler is not None:
+            return handler, (obj, head, tail)
+        
+        # Handle swap actions (for future scenarios)
+        if obj == "Swap" and sep:
+            return self._apply_swap, (obj, head, tail)
+        
+        return self._apply_unknown, (action,)
+    
+    def _apply_unknown(self, action):
+        """Report an action that matches no known intervention type.
+        
+        Args:
+            action: The unrecognized action string.
+            
+        Returns:
+            Tuple of (success, reward_delta).
+        """
+        log.debug("[InterventionApplier] Unknown action type: %s", action)
+        return _FAIL
+    
+    def _apply_malformed(self, action):
+        """Report a shift action that could not be parsed.
+        
+        Args:
+            action: The malformed action string.
+            
         Returns:
             Tuple of (success, reward_delta).
         """
-        direction, magnitude = self.parse_action(action)
+        log.debug("[InterventionApplier] Failed to parse action: %s", action)
+        return _FAIL
+    
+    def _apply_missing(self, obj):
+        """Report an intervention on an object absent from the state.
         
-        if direction is None or magnitude is None:
-            print(f"[InterventionApplier] Failed to parse action: {action}")
-            return False, 0.0
+        Args:
+            obj: Name of the missing object.
+            
+        Returns:
+            Tuple of (success, reward_delta).
+        """
+        log.debug("[InterventionApplier] Object not found in state: %s", obj)
+        return _FAIL
+    
+    def _apply_shift(self, oid, direction, magnitude):
+        """Apply a directional shift intervention.
         
+        Args:
+            oid: StateManager id of the object to shift (see resolve_obj).
+            direction: Direction member parsed from the action.
+            magnitude: Distance to shift in meters.
+            
+        Returns:
+            Tuple of (success, reward_delta).
+        """
         # Apply shift via StateManager
-        success = self.state_manager.apply_shift(obj, direction, magnitude)
+        success = self.state_manager.apply_shift_by_id(oid, direction, magnitude)
         
-        if not success:
-            return False, 0.0
+        # For shifts, we can give a small reward if desired (bool scales
+        # the reward to 0.0 on failure, so no branch is needed)
+        return success, self._shift_reward * success
+    
+    def _apply_shift_no_reward(self, oid, direction, magnitude):
+        """Apply a directional shift when shift_reward is 0.0.
         
-        # For shifts, we can give a small reward if desired
-        reward = self.shift_reward if success else 0.0
+        Specialization of _apply_shift that skips the reward arithmetic;
+        apply_shift_by_id always succeeds, so the result is a constant.
         
-        return success, reward
+        Args:
+            oid: StateManager id of the object to shift (see resolve_obj).
+            direction: Direction member parsed from the action.
+            magnitude: Distance to shift in meters.
+            
+        Returns:
+            Tuple of (success, reward_delta).
+        """
+        self.state_manager.apply_shift_by_id(oid, direction, magnitude)
+        return _SHIFTED
     
-    def _apply_swap(self, action):
+    def _apply_swap(self, obj, first, second):
         """Apply a swap intervention (placeholder for future scenarios).
         
         Args:
-            action: Action string (e.g., '1, 2' to swap objects 1 and 2).
+            obj: Pseudo-object name ('Swap').
+            first: First object of the pair (e.g., '1' for action '1, 2').
+            second: Second object of the pair (e.g., ' 2').
             
         Returns:
             Tuple of (success, reward_delta).
         """
         # TODO: Implement when needed for Scenario 2/3
-        print("[InterventionApplier] Swap not yet implemented")
-        return False, 0.0
+        log.debug("[InterventionApplier] Swap not yet implemented")
+        return _FAIL
     
-    def _apply_pick_place(self, obj, action):
+    def _apply_pick_place(self, obj, verb, target):
         """Apply pick/place intervention (placeholder for future scenarios).
         
         Args:
             obj: Name of the object.
-            action: Action string (e.g., 'pick-top', 'place-top, 2').
+            verb: Action verb (e.g., 'pick-top', 'place-top').
+            target: Target object for place actions (e.g., ' 2'), or '' for picks.
             
         Returns:
             Tuple of (success, reward_delta).
         """
         # TODO: Implement when needed for Scenario 2/3
-        print("[InterventionApplier] Pick/place not yet implemented")
-        return False, 0.0
+        log.debug("[InterventionApplier] Pick/place not yet implemented")
+        return _FAIL
 
 
 def create_intervention_applier(initial_state, shift_reward, alignment_threshold):
@@ -161,4 +340,4 @@ def create_intervention_applier(initial_state, shift_reward, alignment_threshold
         Configured InterventionApplier instance.
     """
     state_manager = StateManager(initial_state, alignment_threshold)
-    return InterventionApplier(state_manager, shift_reward)
\ No newline at end of file
+    return InterventionApplier(state_manager, shift_reward)
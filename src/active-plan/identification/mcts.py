@@ -9,45 +9,121 @@ Author: Yazz Warsame
 
 
 from state_manager import StateManager
-from interventions import InterventionApplier
+from interventions import create_intervention_applier
 from reward_shaper import RewardShaper
+import bisect
+import contextlib
+import logging
 import math
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import os
 import random
 import json
 from pathlib import Path
 from typing import List, Tuple, Dict, Set, Optional
 
 
+log = logging.getLogger(__name__)
+
+# Set in search_parallel() workers: signals that another worker found a solution
+_worker_stop = None
+
+# Largest misalignment bonus a rollout can earn (4 objects x 0.25)
+_MAX_ALIGNMENT_BONUS = 1.0
+
+
 class MCTSNode:
     """Represents a node in the MCTS tree.
     
     Each node corresponds to a state reached by applying a sequence of interventions
-    from the root state.
+    from the root state. Only the last intervention is stored on the node; the
+    full sequence is rebuilt from the parent pointers by path().
     
     Attributes:
-        interventions: Sequence of (object, action) tuples leading to this state.
+        action: The (object, action) tuple applied to reach this node from its
+            parent, or None for root.
+        depth: Number of interventions from the root to this node.
         parent: Parent node in the tree, or None for root.
         children: List of child nodes.
         visits: Number of times this node has been visited.
         total_reward: Cumulative reward from all rollouts through this node.
-        untried_actions: List of legal actions not yet expanded from this node.
-        local_violations: Set of actions that led to violations (used for pruning).
+        mean: total_reward / visits, or 0.0 before the first visit.
+        untried_actions: List of legal actions not yet expanded from this node,
+            stored last-first so the next one is popped from the end.
+        local_violations: Set of actions that led to violations (used for pruning),
+            or None until the first violation is recorded.
+        intervened_objects: Frozenset of objects intervened on along the path.
+        pending: Number of in-flight rollouts through this node.
+        virtual_loss: Reward temporarily subtracted for in-flight rollouts.
+        multiset_key: Sorted tuple of the interventions along the path, used
+            by CausalMCTS.expand() to find transpositions, or None for nodes
+            created without transpositions.
+        shared: [visits, total_reward] of the state this node reaches, shared
+            by all nodes that reach it through a different order of the same
+            interventions, or None without transpositions.
     """
     
-    def __init__(self, interventions = None, parent = None):
+    __slots__ = (
+        'action', 'depth', 'intervened_objects', 'parent', 'children', 'visits',
+        'total_reward', 'mean', 'untried_actions', 'local_violations', 'pending',
+        'virtual_loss', 'multiset_key', 'shared', '_interventions',
+    )
+    
+    def __init__(self, action = None, parent = None):
         """Initialize a new MCTS node.
         
         Args:
-            interventions: List of (object, action) tuples applied to reach this state.
+            action: The (object, action) tuple applied to the parent's state to
+                reach this state, or None if this is the root.
             parent: Parent node in the tree, or None if this is the root.
         """
-        self.interventions = interventions or []
+        self.action = action
+        if parent is None:
+            self.depth = 0
+            self.intervened_objects = frozenset()
+        else:
+            self.depth = parent.depth + 1
+            self.intervened_objects = parent.intervened_objects | {action[0]}
         self.parent = parent
         self.children = []
         self.visits = 0
         self.total_reward = 0.0
+        self.mean = 0.0
         self.untried_actions = None
-        self.local_violations = set()
+        self.local_violations = None
+        self.pending = 0
+        self.virtual_loss = 0.0
+        self.multiset_key = () if parent is None else None
+        self.shared = None
+        self._interventions = None
+
+    def path(self):
+        """Rebuild the intervention sequence leading to this node.
+        
+        Returns:
+            New list of (object, action) tuples, from the root's child down to
+            this node.
+        """
+        path = []
+        node = self
+        while node.parent is not None:
+            path.append(node.action)
+            node = node.parent
+        path.reverse()
+        return path
+
+    @property
+    def interventions(self):
+        """Sequence of (object, action) tuples leading to this state.
+        
+        Materialized from path() on first access and cached on the node; the
+        search itself only uses path(), so most nodes never hold a list.
+        """
+        if self._interventions is None:
+            self._interventions = self.path()
+        return self._interventions
 
 
 class CausalMCTS:
@@ -67,6 +143,17 @@ class CausalMCTS:
         termination_threshold: Reward threshold for early termination.
         exploration_constant: UCT exploration parameter (default: 0.5).
         reward_history: List of rewards from completed rollouts.
+        total_rollouts: Number of rollouts evaluated, including those of
+            search_parallel() workers.
+        seed: Seed for the planner's random number generator, or None.
+        verbose: Whether per-iteration diagnostics are logged.
+        track_trace: Whether backpropagate() records intervention_trace.
+        transpositions: Whether nodes reached by different orders of the same
+            interventions share their state's value estimate.
+        prune_min_visits: Visits a node needs before children whose subtree
+            cannot beat the best reward seen are pruned from selection.
+        intervention_trace: Backpropagation records (see trace_records()).
+        root: Root node of the most recent search_resolution() call.
     """
     
     def __init__(
@@ -78,7 +165,12 @@ class CausalMCTS:
         intervention_space,
         max_rollout_depth,
         termination_threshold,
-        exploration_constant
+        exploration_constant,
+        seed=None,
+        verbose=False,
+        track_trace=False,
+        transpositions=False,
+        prune_min_visits=10
     ):
         """Initialize the Causal MCTS planner.
         
@@ -91,6 +183,15 @@ class CausalMCTS:
             max_rollout_depth: Maximum number of interventions in a rollout.
             termination_threshold: Reward value that indicates success.
             exploration_constant: UCT exploration constant (higher = more exploration).
+            seed: Seed for the rollout random number generator (default: None,
+                seeded from the operating system).
+            verbose: Log per-iteration diagnostics at DEBUG level (default: False).
+            track_trace: Record every node update made by backpropagate() in
+                intervention_trace (default: False).
+            transpositions: Share the value estimate of a state between the
+                intervention orders that reach it (default: False).
+            prune_min_visits: Minimum parent visits before branch-and-bound
+                pruning applies in selection (default: 10).
         """
         self.initial_state = initial_state
         self.goal_state = goal_state
@@ -101,16 +202,101 @@ class CausalMCTS:
         self.termination_threshold = termination_threshold
         self.exploration_constant = exploration_constant
         
+        # Per-planner RNG so parallel workers draw independent rollouts
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self.verbose = verbose
+        self.track_trace = track_trace
+        self.transpositions = transpositions
+        self.prune_min_visits = prune_min_visits
+        
         self.reward_history = []
         self.intervention_trace = []
         
+        # Rollouts evaluated by search_parallel() workers, which only report
+        # their count back rather than their reward_history
+        self._worker_rollouts = 0
+        
         # Track if we've found a solution
         self.solution_found = False
         
         # Current symbolic state (will be updated during rollouts)
         self.current_relationships = set(initial_state.get('relationships', []))
+        
+        # Intervention space as immutable (object, action) tuples per object,
+        # and legal actions per intervened-object set
+        self._actions_by_obj = {
+            obj: tuple((obj, action) for action in actions)
+            for obj, actions in intervention_space.items()
+        }
+        self._all_actions = tuple(
+            candidate for candidates in self._actions_by_obj.values() for candidate in candidates
+        )
+        self._legal_cache = {}
+        
+        # Sorted intervention multiset -> shared [visits, total_reward] of the
+        # state it reaches, for the current search
+        self._transposition = {}
+        
+        # Best rollout reward of the current search, and reward upper bounds
+        # per subtree depth (see _subtree_bound)
+        self._best_reward = -float('inf')
+        self._bound_cache = {}
+        if "Swap" in intervention_space:
+            self._max_tree_depth = None  # Swaps may repeat without limit
+        else:
+            self._max_tree_depth = len(intervention_space)
+        
+        # Rollout appliers per thread, restored from _initial_snapshot
+        # instead of being rebuilt from initial_state on every rollout
+        self._appliers = {}
+        self._initial_snapshot = None
+        
+        self.root = None
+        
+        # Event shared with sibling search_parallel() workers, or None
+        self._stop = None
 
-    def search_resolution(self, iterations: int = 300):
+    def __getstate__(self):
+        # The search tree is not needed by (and is expensive to send to)
+        # worker processes
+        state = self.__dict__.copy()
+        state['root'] = None
+        state['_appliers'] = {}
+        state['intervention_trace'] = []
+        state['_transposition'] = {}
+        state['_stop'] = None
+        state['reward_history'] = []
+        state['_worker_rollouts'] = 0
+        return state
+    
+    @property
+    def total_rollouts(self):
+        """Number of rollouts evaluated, including search_parallel() workers'."""
+        return len(self.reward_history) + self._worker_rollouts
+
+    def _rollout_applier(self):
+        """Get this thread's rollout applier, reset to the initial state.
+        
+        Returns:
+            InterventionApplier whose state matches self.initial_state.
+        """
+        thread_id = threading.get_ident()
+        applier = self._appliers.get(thread_id)
+        
+        if applier is None:
+            # Using stricter threshold (5mm) for Scenario 1 misalignments of 10-25mm
+            applier = self._appliers[thread_id] = create_intervention_applier(
+                self.initial_state, shift_reward=0.0, alignment_threshold=0.005
+            )
+            if self._initial_snapshot is None:
+                self._initial_snapshot = applier.state_manager.snapshot()
+        else:
+            applier.state_manager.restore(self._initial_snapshot)
+        
+        return applier
+
+    def search_resolution(self, iterations: int = 300, batch_size: int = 1):
         """Execute MCTS search for a fixed number of iterations.
         
         This is the main entry point for running the MCTS algorithm. It performs
@@ -118,68 +304,274 @@ class CausalMCTS:
         
         Args:
             iterations: Number of MCTS iterations to perform.
+            batch_size: Rollouts per expanded node, sharing its prefix (see
+                rollout_batch); each reward is backpropagated separately.
             
         Returns:
             A tuple containing:
                 - Best sequence of interventions found (list of (object, action) tuples)
                 - Number of iterations completed before termination
         """
-        root = MCTSNode()
+        root = self.root = MCTSNode()
+        self._transposition = {}
+        self._best_reward = -float('inf')
         
         # Initialize root with all legal actions
-        base_actions = self.get_legal_actions([], root)
+        base_actions = self._untried_actions(root)
         root.untried_actions = base_actions
         
         print(f"Starting MCTS with {len(base_actions)} possible root actions")
         print(f"Goal: {self.goal_state}")
         print(f"Termination threshold: {self.termination_threshold}\n")
         
+        # Per-iteration diagnostics are off the hot path unless requested
+        debug = self.verbose and log.isEnabledFor(logging.DEBUG)
+        
         for i in range(iterations):
-            print(f"--- Iteration {i} ---")
+            if debug:
+                log.debug("--- Iteration %d ---", i)
             
             # MCTS phases
             node = self.select(root)
             child = self.expand(node)
             
             # Skip if root is exhausted
-            if child.interventions == []:
+            if child.parent is None:
                 continue
             
+            # Stop if a sibling search_parallel() worker found a solution
+            if self._stop is not None and self._stop.is_set():
+                return [], i
+            
             # Check if another process found a solution (for future parallel version)
             if self.solution_found:
                 print(f"Solution found at iteration {i}")
                 if self.reward_history:
                     return self.reward_history[-1]['interventions'], i
-                return child.interventions, i
+                return child.path(), i
             
-            # Perform rollout
-            reward = self.rollout(child)
+            # Perform rollout(s)
+            if batch_size > 1:
+                rewards = self.rollout_batch(child, batch_size)
+                reward = max(rewards)
+            else:
+                reward = self.rollout(child)
+                rewards = (reward,)
             
-            print(f"[ITER {i}] reward={reward:.3f}, depth={len(child.interventions)}, "
-                  f"interventions={child.interventions}")
+            if debug:
+                log.debug("[ITER %d] reward=%.3f, depth=%d, interventions=%s",
+                          i, reward, child.depth, child.path())
             
             # Backpropagate reward
-            self.backpropagate(child, reward)
+            for r in rewards:
+                self.backpropagate(child, r)
             
             # Check for early termination
             if reward >= self.termination_threshold:
+                solution = child.path()
                 print(f"\n Success! Found solution at iteration {i}")
-                print(f"Final interventions: {child.interventions}")
+                print(f"Final interventions: {solution}")
                 self.solution_found = True
-                return child.interventions, i
+                return solution, i
         
         # Return best solution found
         if root.children:
             best = max(root.children, 
-                      key=lambda c: c.total_reward / c.visits if c.visits else 0.0)
+                      key=lambda c: c.mean)
+            solution = best.path()
             print(f"\nCompleted {iterations} iterations.")
-            print(f"Best solution: {best.interventions}")
-            print(f"Best reward: {best.total_reward / best.visits if best.visits else 0.0:.3f}")
-            return best.interventions, iterations
+            print(f"Best solution: {solution}")
+            print(f"Best reward: {best.mean:.3f}")
+            return solution, iterations
         else:
             print("\nNo solution found.")
             return [], iterations
 
+    def search_parallel(self, iterations: int = 300, n_workers: Optional[int] = None):
+        """Execute root-parallel MCTS search across worker processes.
+        
+        Each worker runs search_resolution() on an independent copy of this
+        planner with its own root and RNG seed, for iterations // n_workers
+        iterations. The search stops as soon as any worker reaches the
+        termination threshold; otherwise the root children of all workers
+        are merged by (object, action) and the one with the highest combined
+        mean reward is returned. The iteration count and total_rollouts
+        cover all workers. Workers print nothing and log no diagnostics;
+        this method prints a single summary.
+        
+        Args:
+            iterations: Total number of MCTS iterations across all workers.
+            n_workers: Number of worker processes (default: CPU count).
+            
+        Returns:
+            A tuple containing:
+                - Best sequence of interventions found (list of (object, action) tuples)
+                - Number of iterations completed before termination, summed
+                  over all workers
+        """
+        n_workers = n_workers or os.cpu_count() or 1
+        if n_workers == 1:
+            return self.search_resolution(iterations=iterations)
+        
+        if self.seed is None:
+            seeds = [None] * n_workers
+        else:
+            seeds = [self.seed + k for k in range(n_workers)]
+        per_worker = max(1, iterations // n_workers)
+        jobs = [(self, seed, per_worker) for seed in seeds]
+        
+        print(f"Starting root-parallel MCTS on {n_workers} workers with "
+              f"{len(self.get_legal_actions(MCTSNode()))} possible root actions")
+        print(f"Goal: {self.goal_state}")
+        print(f"Termination threshold: {self.termination_threshold}\n")
+        
+        root_stats = {}
+        solution = None
+        total_iter = 0
+        
+        # Workers stop on a shared event rather than through Pool.terminate(),
+        # which can deadlock when a worker is killed holding a queue lock.
+        # Once a solution is found the remaining workers stop at their next
+        # iteration, and their counts are still collected
+        stop = multiprocessing.Event()
+        pool = multiprocessing.Pool(n_workers, initializer=_init_worker, initargs=(stop,))
+        try:
+            for interventions, final_iter, solved, rollouts, stats in pool.imap_unordered(_run_search, jobs):
+                total_iter += final_iter
+                self._worker_rollouts += rollouts
+                
+                if solution is not None:
+                    continue
+                if solved:
+                    solution = interventions, final_iter
+                    stop.set()
+                    continue
+                
+                for action, (visits, total_reward) in stats.items():
+                    merged = root_stats.setdefault(action, [0, 0.0])
+                    merged[0] += visits
+                    merged[1] += total_reward
+        finally:
+            stop.set()
+            pool.close()
+            pool.join()
+        
+        if solution is not None:
+            print(f"\n Success! Worker found solution at iteration {solution[1]}")
+            print(f"Final interventions: {solution[0]}")
+            self.solution_found = True
+            return solution[0], total_iter
+        
+        # Return the root action with the best mean reward across workers
+        if root_stats:
+            best, (visits, total_reward) = max(
+                root_stats.items(),
+                key=lambda item: item[1][1] / item[1][0] if item[1][0] else 0.0
+            )
+            print(f"\nCompleted {total_iter} iterations on {n_workers} workers.")
+            print(f"Best solution: {[best]}")
+            print(f"Best reward: {total_reward / visits if visits else 0.0:.3f}")
+            return [best], total_iter
+        else:
+            print("\nNo solution found.")
+            return [], total_iter
+
+    def search_leaf_parallel(self, iterations: int = 300, n_threads: int = 4,
+                             virtual_loss: float = 1.0):
+        """Execute MCTS search with several rollouts in flight at once.
+        
+        Keeps up to n_threads rollouts running on a thread pool. Before a
+        rollout is submitted, every node on its path receives a virtual loss
+        so that concurrent selections spread over different leaves; the loss
+        is removed when the rollout completes and its reward is
+        backpropagated.
+        
+        Args:
+            iterations: Number of MCTS iterations to perform.
+            n_threads: Maximum number of concurrent rollouts.
+            virtual_loss: Reward subtracted per in-flight rollout on its path.
+            
+        Returns:
+            A tuple containing:
+                - Best sequence of interventions found (list of (object, action) tuples)
+                - Number of iterations completed before termination
+        """
+        root = self.root = MCTSNode()
+        self._transposition = {}
+        self._best_reward = -float('inf')
+        root.untried_actions = self._untried_actions(root)
+        
+        print(f"Starting leaf-parallel MCTS with {len(root.untried_actions)} possible root actions")
+        
+        in_flight = {}
+        i = 0
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            while i < iterations or in_flight:
+                # Fill the pool with rollouts from distinct selections
+                while i < iterations and len(in_flight) < n_threads:
+                    child = self.expand(self.select(root))
+                    i += 1
+                    
+                    # Skip if root is exhausted
+                    if child.parent is None:
+                        continue
+                    
+                    self._add_virtual_loss(child, virtual_loss)
+                    in_flight[pool.submit(self.rollout, child)] = child
+                
+                if not in_flight:
+                    break
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    child = in_flight.pop(future)
+                    reward = future.result()
+                    
+                    self._add_virtual_loss(child, -virtual_loss)
+                    self.backpropagate(child, reward)
+                    
+                    if reward >= self.termination_threshold:
+                        solution = child.path()
+                        print(f"\n Success! Found solution at iteration {i}")
+                        print(f"Final interventions: {solution}")
+                        self.solution_found = True
+                        
+                        # Settle the other in-flight rollouts, so no virtual
+                        # loss is left behind and every finished rollout is
+                        # counted in the tree
+                        pool.shutdown(wait=True, cancel_futures=True)
+                        for future, pending_child in in_flight.items():
+                            self._add_virtual_loss(pending_child, -virtual_loss)
+                            if not future.cancelled():
+                                self.backpropagate(pending_child, future.result())
+                        return solution, i
+        
+        # Return best solution found
+        if root.children:
+            best = max(root.children,
+                      key=lambda c: c.mean)
+            solution = best.path()
+            print(f"\nCompleted {iterations} iterations.")
+            print(f"Best solution: {solution}")
+            return solution, iterations
+        else:
+            print("\nNo solution found.")
+            return [], iterations
+
+    @staticmethod
+    def _add_virtual_loss(node: MCTSNode, loss: float):
+        """Mark (loss > 0) or unmark (loss < 0) an in-flight rollout.
+        
+        Args:
+            node: Node the rollout starts from; its ancestors are updated too.
+            loss: Virtual loss to add to each node on the path.
+        """
+        step = 1 if loss > 0 else -1
+        while node is not None:
+            node.pending += step
+            node.virtual_loss += loss
+            node = node.parent
+
     def select(self, node: MCTSNode):
         """Select a node to expand using UCT policy.
         
@@ -199,11 +591,16 @@ class CausalMCTS:
             
             # If node has children, descend using UCT
             if node.children:
-                node = self._best_child(node)
+                child = self._best_child(node)
+                
+                # All children pruned: treat as a leaf
+                if child is None:
+                    return node
+                node = child
                 
                 # Initialize untried actions for this node if needed
                 if node.untried_actions is None:
-                    node.untried_actions = self.get_legal_actions(node.interventions, node)
+                    node.untried_actions = self._untried_actions(node)
                 continue
             
             # Leaf node with no untried actions
@@ -216,24 +613,49 @@ class CausalMCTS:
         UCT = exploitation + exploration
             = (total_reward / visits) + c * sqrt(ln(parent_visits) / visits)
         
+        In-flight rollouts (see search_leaf_parallel) count as visits that
+        returned their virtual loss, steering other workers to other leaves.
+        
+        Once the node has prune_min_visits visits, children whose subtree
+        reward upper bound is below the best reward seen are skipped.
+        
         Args:
             node: Parent node.
             
         Returns:
-            Child node with maximum UCT score.
+            Child node with maximum UCT score, or None if all are pruned.
         """
         best_child = None
         best_score = -float('inf')
+        parent_visits = node.visits + node.pending
+        
+        # Branch-and-bound: children share a depth, hence a bound
+        if node.visits >= self.prune_min_visits and node.children:
+            if self._subtree_bound(node.depth + 1) < self._best_reward - 1e-9:
+                return None
+        
+        # ln(parent_visits) is shared by all children
+        log_n = math.log(parent_visits) if parent_visits > 0 else 0.0
+        c = self.exploration_constant
+        sqrt = math.sqrt
         
         for child in node.children:
             # Exploitation term
-            exploit = child.total_reward / child.visits if child.visits > 0 else 0.0
+            if child.pending:
+                visits = child.visits + child.pending
+                exploit = (child.total_reward - child.virtual_loss) / visits
+            else:
+                visits = child.visits
+                shared = child.shared
+                if shared is not None and shared[0]:
+                    # Value of the state, over every order reaching it
+                    exploit = shared[1] / shared[0]
+                else:
+                    exploit = child.mean
             
             # Exploration term
-            if child.visits > 0 and node.visits > 0:
-                explore = self.exploration_constant * math.sqrt(
-                    math.log(node.visits) / child.visits
-                )
+            if visits > 0 and parent_visits > 0:
+                explore = c * sqrt(log_n / visits)
             else:
                 explore = float('inf')  # Prioritize unvisited children
             
@@ -245,65 +667,172 @@ class CausalMCTS:
         
         return best_child
 
+    def _rollout_bound(self, depth):
+        """Upper bound on the reward of a rollout from a node at depth.
+        
+        Mirrors the terms added up by rollout_batch(): step and final rewards
+        for the prefix, the misalignment bonus, then the best possible
+        suffix, counted only if it can increase the reward.
+        
+        Args:
+            depth: Number of interventions in the node's prefix.
+            
+        Returns:
+            Reward no rollout from such a node can exceed.
+        """
+        shift_bonus = max(self.reward_shaper.shift_bonus, 0.0)
+        depth_penalty = self.reward_shaper.depth_penalty
+        
+        prefix = shift_bonus * depth + 1.0 - depth_penalty * depth + _MAX_ALIGNMENT_BONUS
+        
+        # Suffix reward is linear in its length, so an endpoint is best
+        budget = max(0, self.max_rollout_depth - depth)
+        suffix = max(
+            shift_bonus * k + 1.0 - depth_penalty * (depth + k) for k in (0, budget)
+        )
+        return prefix + max(suffix, 0.0)
+
+    def _subtree_bound(self, depth):
+        """Upper bound on any rollout reward in a subtree rooted at depth.
+        
+        _rollout_bound() is convex on each side of max_rollout_depth, so its
+        maximum over the reachable depths is attained at depth, at
+        max_rollout_depth or at the deepest reachable depth.
+        
+        Args:
+            depth: Depth of the subtree's root node.
+            
+        Returns:
+            Reward no rollout from the subtree can exceed.
+        """
+        bound = self._bound_cache.get(depth)
+        if bound is not None:
+            return bound
+        
+        max_depth = self._max_tree_depth
+        if max_depth is None:
+            # Beyond max_rollout_depth the bound grows like
+            # (shift_bonus - depth_penalty) * depth
+            if max(self.reward_shaper.shift_bonus, 0.0) > self.reward_shaper.depth_penalty:
+                bound = float('inf')
+            else:
+                bound = max(self._rollout_bound(d) for d in (depth, max(depth, self.max_rollout_depth)))
+        else:
+            deepest = max(depth, max_depth)
+            middle = min(max(depth, self.max_rollout_depth), deepest)
+            bound = max(self._rollout_bound(d) for d in (depth, middle, deepest))
+        
+        self._bound_cache[depth] = bound
+        return bound
+
     def expand(self, node: MCTSNode):
         """Expand a node by trying an untried action.
         
         Creates a new child node by applying one of the untried actions from the given node.
         
+        Shift interventions commute, so the state reached only depends on the
+        multiset of interventions applied. With transpositions enabled, nodes
+        reaching the same multiset through different orders share the value
+        estimate of that state (see MCTSNode.shared). Visits and rewards are
+        still kept per node, i.e. per edge of the tree, so every rollout is
+        counted once on each level.
+        
         Args:
             node: Node to expand.
             
         Returns:
-            Newly created child node, or the input node if no actions available.
+            Newly created child node, or the input node if no actions
+            available.
         """
 
         if node.untried_actions is None:
-            node.untried_actions = self.get_legal_actions(node.interventions, node)
+            node.untried_actions = self._untried_actions(node)
         
         if not node.untried_actions:
             return node
         
-        # Select and remove an untried action
-        action = node.untried_actions.pop(0)
+        # Select and remove an untried action (O(1) from the end)
+        action = node.untried_actions.pop()
         
         # Create new child with this action
-        new_interventions = node.interventions + [action]
-        child = MCTSNode(interventions=new_interventions, parent=node)
+        child = MCTSNode(action=action, parent=node)
         node.children.append(child)
         
+        if self.transpositions:
+            # The child's key is the parent's sorted key with action inserted,
+            # so the path back to the root is not walked again
+            if node.multiset_key is None:
+                node.multiset_key = tuple(sorted(node.path()))
+            key = list(node.multiset_key)
+            bisect.insort(key, action)
+            key = child.multiset_key = tuple(key)
+            
+            # Same state reached in a different order shares its statistics
+            shared = self._transposition.get(key)
+            if shared is None:
+                shared = self._transposition[key] = [0, 0.0]
+            child.shared = shared
+        
         return child
 
-    def get_legal_actions(self, interventions, node):
+    def get_legal_actions(self, node):
         """Generate list of legal actions for a given state.
         
-        Determines which interventions are valid to apply next, based on the current
-        sequence of interventions and any known violations.
+        Determines which interventions are valid to apply next, based on the objects
+        already intervened on along the node's path and any known violations.
         
         Args:
-            interventions: Current sequence of (object, action) tuples.
             node: Current MCTS node (used for pruning based on violations).
             
+        Returns:
+            List of legal (object, action) tuples that can be applied next, in
+            intervention-space order.
+        """
+        return list(self._legal_actions(node.intervened_objects, node.local_violations))
+    
+    def _untried_actions(self, node):
+        """Build the untried_actions list of a node.
+        
+        Args:
+            node: MCTS node whose actions have not been initialized yet.
+            
+        Returns:
+            Legal actions of the node in reverse intervention-space order, so
+            that expand() pops them in order from the end of the list.
+        """
+        return self._legal_actions(node.intervened_objects, node.local_violations)[::-1]
+
+    def _legal_actions(self, intervened_objects, violations):
+        """Return the shared legal-action list for an intervened-object set.
+        
+        Legality only depends on which objects were already intervened on and
+        on the known violations, so the list is computed once per frozenset.
+        The returned list must not be modified.
+        
+        Args:
+            intervened_objects: Frozenset of objects already intervened on.
+            violations: Set of (object, action) tuples marked as violations,
+                or None.
+            
         Returns:
             List of legal (object, action) tuples that can be applied next.
         """
-        legal_actions = []
+        legal_actions = self._legal_cache.get(intervened_objects)
         
-        # Get all possible actions from intervention space
-        for obj, actions in self.intervention_space.items():
-            for action in actions:
-                candidate = (obj, action)
-                
-                # Skip if this action has been marked as a violation
-                if candidate in node.local_violations:
-                    continue
-                
-                # Skip if object was already intervened on (optional - can be relaxed)
-                intervened_objects = {intv[0] for intv in interventions}
-                if obj in intervened_objects and obj != "Swap":
-                    continue
-                
-                legal_actions.append(candidate)
+        if legal_actions is None:
+            if intervened_objects:
+                # Skip objects already intervened on (optional - can be relaxed)
+                legal_actions = []
+                for obj, candidates in self._actions_by_obj.items():
+                    if obj not in intervened_objects or obj == "Swap":
+                        legal_actions.extend(candidates)
+            else:
+                legal_actions = list(self._all_actions)
+            self._legal_cache[intervened_objects] = legal_actions
         
+        # Skip actions that have been marked as violations
+        if violations:
+            return [candidate for candidate in legal_actions if candidate not in violations]
         return legal_actions
 
     def rollout(self, node: MCTSNode) -> float:
@@ -318,46 +847,70 @@ class CausalMCTS:
         Returns:
             Total reward accumulated during the rollout.
         """
-    
+        return self.rollout_batch(node, batch_size=1)[0]
+
+    def rollout_batch(self, node: MCTSNode, batch_size: int = 64) -> List[float]:
+        """Perform several random rollouts from the given node.
+        
+        The node's interventions and the reward they earn are applied and
+        computed once; each rollout then restores the state reached after
+        them and continues with its own random suffix.
         
-        # Create a fresh state manager for this rollout
-        # Using stricter threshold (5mm) for Scenario 1 misalignments of 10-25mm
-        state_mgr = StateManager(self.initial_state, alignment_threshold=0.005)
-        applier = InterventionApplier(state_mgr, shift_reward=0.0)
+        Args:
+            node: Node from which to start the rollouts.
+            batch_size: Number of rollouts to perform.
+            
+        Returns:
+            Total reward accumulated during each rollout. If the node's
+            interventions alone reach the termination threshold, no suffix is
+            simulated and a single reward is returned.
+        """
+        # Get a state manager reset to the initial state for this rollout
+        applier = self._rollout_applier()
+        state_mgr = applier.state_manager
+        
+        # Bind hot-loop callables once per rollout
+        shaper = self.reward_shaper
+        predicate_bits = shaper.predicate_bits
+        apply = applier.apply
+        get_relationships_mask = state_mgr.get_relationships_mask
+        shaper_step_reward = shaper.step_reward
         
-        # Track relationships
-        prev_rels = set(self.initial_state.get('relationships', []))
+        # Track relationships as goal-predicate bitmasks
+        prev_rels = shaper.mask(self.initial_state.get('relationships', []))
         
         shaped_reward = 0.0
         
         # 1) Apply the prefix interventions (deterministic part)
-        for obj, action in node.interventions:
+        rollout_history = node.path()
+        prefix_len = len(rollout_history)
+        for obj, action in rollout_history:
             # Apply intervention to state
-            success, step_reward = applier.apply(obj, action)
+            success, step_reward = apply(obj, action)
             
             # Get updated relationships
-            current_rels = state_mgr.get_relationships()
+            current_rels = get_relationships_mask(predicate_bits)
             
             # Compute step reward
-            shaped_reward += self.reward_shaper.step_reward(prev_rels, current_rels, action)
-            prev_rels = current_rels.copy()
+            shaped_reward += shaper_step_reward(prev_rels, current_rels, action)
+            prev_rels = current_rels
             
             # Add immediate reward from intervention (if any)
             shaped_reward += step_reward
         
         # Get current relationships after prefix
-        current_rels = state_mgr.get_relationships()
+        current_rels = get_relationships_mask(predicate_bits)
         
         # Add final reward for the prefix
-        shaped_reward += self.reward_shaper.final_reward(current_rels, node.interventions)
+        shaped_reward += shaper.final_reward_mask(current_rels, prefix_len)
         
         # Check for misalignment bonus (Scenario 1 specific)
         # ALL objects should align with Object 0 (the reference)
         misalignment_bonus = 0.0
         
-        # DEBUG: Print alignment details
-        if len(node.interventions) <= 1:  # Only debug first few
-            print(f"\n  [DEBUG] Alignment check after {len(node.interventions)} interventions:")
+        # DEBUG: Log alignment details
+        if self.verbose and prefix_len <= 1 and log.isEnabledFor(logging.DEBUG):
+            log.debug("\n  [DEBUG] Alignment check after %d interventions:", prefix_len)
             for obj in ['1', '2', '3', '4']:
                 obj_pos = state_mgr.get_position(obj)
                 ref_pos = state_mgr.get_position('0')
@@ -365,62 +918,83 @@ class CausalMCTS:
                     x_diff = abs(obj_pos[0] - ref_pos[0])
                     y_diff = abs(obj_pos[1] - ref_pos[1])
                     is_aligned = not state_mgr.check_misalignment(obj, reference='0')
-                    print(f"    Obj {obj} vs 0: pos={obj_pos[:2]}, ref={ref_pos[:2]}, "
-                          f"x_diff={x_diff:.4f}, y_diff={y_diff:.4f}, "
-                          f"aligned={is_aligned}, threshold={state_mgr.alignment_threshold}")
+                    log.debug("    Obj %s vs 0: pos=%s, ref=%s, x_diff=%.4f, y_diff=%.4f, "
+                              "aligned=%s, threshold=%s", obj, obj_pos[:2], ref_pos[:2],
+                              x_diff, y_diff, is_aligned, state_mgr.alignment_threshold)
                     if is_aligned:
                         misalignment_bonus += 0.25
         else:
-            # Normal operation without debug prints
-            for obj in ['1', '2', '3', '4']:
-                if not state_mgr.check_misalignment(obj, reference='0'):
-                    misalignment_bonus += 0.25  # Aligned with Object 0!
+            # Normal operation without debug output
+            misalignment_bonus = 0.25 * state_mgr.count_aligned(('1', '2', '3', '4'), reference='0')
         
         shaped_reward += misalignment_bonus
         
         # 2) Early exit if we've hit the termination threshold
         if shaped_reward >= self.termination_threshold:
             self.reward_history.append({
-                "interventions": node.interventions.copy(),
+                "interventions": rollout_history,
                 "reward": shaped_reward,
             })
-            return shaped_reward
+            if shaped_reward > self._best_reward:
+                self._best_reward = shaped_reward
+            return [shaped_reward]
         
-        # 3) Random rollout suffix (if allowed)
-        rollout_history = node.interventions.copy()
-        prefix_len = len(node.interventions)
+        # 3) Random rollout suffixes (if allowed), each from the prefix state
         suffix_budget = max(0, self.max_rollout_depth - prefix_len)
+        legal_actions = self._legal_actions
+        random_ = self._rng.random
+        violations = node.local_violations
         
-        for _ in range(suffix_budget):
-            valid_actions = self.get_legal_actions(rollout_history, node)
-            
-            if not valid_actions:
-                break
+        prefix = rollout_history
+        prefix_reward = shaped_reward
+        prefix_rels = prev_rels
+        prefix_state = state_mgr.snapshot() if batch_size > 1 else None
+        rewards = []
+        
+        for k in range(batch_size):
+            if k:
+                state_mgr.restore(prefix_state)
+            rollout_history = prefix.copy() if k < batch_size - 1 else prefix
+            shaped_reward = prefix_reward
+            prev_rels = prefix_rels
+            intervened = node.intervened_objects
             
-            # Choose random action for rollout
-            obj, action = random.choice(valid_actions)
-            rollout_history.append((obj, action))
+            for _ in range(suffix_budget):
+                valid_actions = legal_actions(intervened, violations)
+                
+                if not valid_actions:
+                    break
+                
+                # Choose random action for rollout (an index draw from
+                # random() is cheaper than Random.choice/randrange)
+                obj, action = valid_actions[int(random_() * len(valid_actions))]
+                rollout_history.append((obj, action))
+                if obj not in intervened:
+                    intervened = intervened | {obj}
+                
+                # Apply intervention
+                success, step_reward = apply(obj, action)
+                current_rels = get_relationships_mask(predicate_bits)
+                
+                # Compute step reward
+                shaped_reward += shaper_step_reward(prev_rels, current_rels, action)
+                shaped_reward += step_reward
+                prev_rels = current_rels
             
-            # Apply intervention
-            success, step_reward = applier.apply(obj, action)
-            current_rels = state_mgr.get_relationships()
+            # Compute final reward
+            current_rels = get_relationships_mask(predicate_bits)
+            shaped_reward += shaper.final_reward_mask(current_rels, len(rollout_history))
             
-            # Compute step reward
-            shaped_reward += self.reward_shaper.step_reward(prev_rels, current_rels, action)
-            shaped_reward += step_reward
-            prev_rels = current_rels.copy()
-        
-        # Compute final reward
-        current_rels = state_mgr.get_relationships()
-        shaped_reward += self.reward_shaper.final_reward(current_rels, rollout_history)
+            # Record this rollout
+            self.reward_history.append({
+                "interventions": rollout_history,
+                "reward": shaped_reward,
+            })
+            rewards.append(shaped_reward)
+            if shaped_reward > self._best_reward:
+                self._best_reward = shaped_reward
         
-        # Record this rollout
-        self.reward_history.append({
-            "interventions": rollout_history.copy(),
-            "reward": shaped_reward,
-        })
-       
-        return shaped_reward
+        return rewards
 
     def checkMisalignment(self, obj, state_manager):
         """Check if an object is misaligned relative to a reference.
@@ -463,7 +1037,8 @@ class CausalMCTS:
         """Backpropagate reward up the tree.
         
         Updates visit counts and total rewards for all nodes from the given node
-        back to the root.
+        back to the root, and the shared statistics of the states they reach
+        when transpositions are enabled.
         
         Args:
             node: Node where rollout ended.
@@ -472,21 +1047,84 @@ class CausalMCTS:
         while node is not None:
             node.visits += 1
             node.total_reward += reward
+            node.mean = node.total_reward / node.visits
+            
+            shared = node.shared
+            if shared is not None:
+                shared[0] += 1
+                shared[1] += reward
             
             # Propagate violations up to parent
-            if node.parent:
-                node.parent.local_violations.update(node.local_violations)
-            
-            # Record trace for debugging
-            avg_reward = node.total_reward / node.visits
-            self.intervention_trace.append({
-                'interventions': node.interventions.copy(),
-                'visits': node.visits,
+            parent = node.parent
+            if parent and node.local_violations:
+                if parent.local_violations is None:
+                    parent.local_violations = set(node.local_violations)
+                else:
+                    parent.local_violations.update(node.local_violations)
+            
+            # Record trace for debugging (paths are rebuilt by trace_records)
+            if self.track_trace:
+                self.intervention_trace.append((node, node.visits, node.mean, reward))
+            
+            node = parent
+
+    def trace_records(self):
+        """Expand intervention_trace into dictionaries for analysis.
+        
+        Returns:
+            List of dictionaries with 'interventions', 'visits', 'avg_reward'
+            and 'reward' keys, one per recorded node update.
+        """
+        return [
+            {
+                'interventions': node.path(),
+                'visits': visits,
                 'avg_reward': avg_reward,
                 'reward': reward
-            })
-            
-            node = node.parent
+            }
+            for node, visits, avg_reward, reward in self.intervention_trace
+        ]
+
+
+def _init_worker(stop):
+    """Pool initializer for search_parallel() worker processes.
+    
+    Args:
+        stop: multiprocessing.Event set once any worker finds a solution.
+    """
+    global _worker_stop
+    _worker_stop = stop
+
+
+def _run_search(job):
+    """Run one root-parallel search_resolution() worker.
+    
+    Args:
+        job: Tuple of (planner, seed, iterations); planner is a pickled copy
+            of the parent CausalMCTS.
+        
+    Returns:
+        Tuple of (interventions, final_iteration, solution_found,
+        rollouts, root_stats), where rollouts is the worker's number of
+        evaluated rollouts and root_stats maps each root action to its
+        (visits, total_reward).
+    """
+    planner, seed, iterations = job
+    planner._rng = random.Random(seed)
+    planner._stop = _worker_stop
+    
+    # The parent prints a single summary for all workers
+    planner.verbose = False
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        interventions, final_iter = planner.search_resolution(iterations=iterations)
+    if planner.solution_found and _worker_stop is not None:
+        _worker_stop.set()
+    
+    root_stats = {
+        child.action: (child.visits, child.total_reward)
+        for child in planner.root.children
+    }
+    return interventions, final_iter, planner.solution_found, len(planner.reward_history), root_stats
 
 
 def load_scenario(scenario_name):
@@ -520,8 +1158,13 @@ def main():
     """Main entry point for running MCTS intervention planning.
     
     Allows user to select a scenario and runs the MCTS planner to find
-    a sequence of interventions that achieves the goal.
+    a sequence of interventions that achieves the goal. The search runs
+    sequentially unless the MCTS_WORKERS environment variable asks for
+    several root-parallel worker processes (see search_parallel).
     """
+    verbose = False  # Set to True for per-iteration diagnostics (slow)
+    logging.basicConfig(level=logging.DEBUG if verbose else logging.WARNING, format='%(message)s')
+    
     print("=" * 60)
     print("Causal MCTS Intervention Planner")
     print("=" * 60)
@@ -569,7 +1212,8 @@ def main():
         intervention_space=scenario_config["intv_space"],
         max_rollout_depth=scenario_config["max_rollout_depth"],
         termination_threshold=scenario_config["termination_threshold"],
-        exploration_constant=0
+        exploration_constant=0,
+        verbose=verbose
     )
     
     # Run MCTS search
@@ -594,7 +1238,15 @@ def main():
     print()
     
     iterations = 300000  # Can make this configurable
-    result_interventions, final_iter = planner.search_resolution(iterations=iterations)
+    
+    # Sequential by default; MCTS_WORKERS=N opts in to N root-parallel workers
+    n_workers = int(os.environ.get('MCTS_WORKERS', '1'))
+    if n_workers > 1:
+        result_interventions, final_iter = planner.search_parallel(
+            iterations=iterations, n_workers=n_workers
+        )
+    else:
+        result_interventions, final_iter = planner.search_resolution(iterations=iterations)
     
     # Display results
     print("\n" + "=" * 60)
@@ -609,7 +1261,7 @@ def main():
         print("\nNo solution found within iteration limit.")
     
     print(f"\nTotal iterations: {final_iter}")
-    print(f"Total rollouts evaluated: {len(planner.reward_history)}")
+    print(f"Total rollouts evaluated: {planner.total_rollouts}")
     
     # Save results to file
     output_file = f"results_{scenario_name}.json"
@@ -617,7 +1269,7 @@ def main():
         'scenario': scenario_name,
         'interventions': result_interventions,
         'iterations': final_iter,
-        'total_rollouts': len(planner.reward_history),
+        'total_rollouts': planner.total_rollouts,
         'goal_achieved': planner.solution_found
     }
     
@@ -7,6 +7,10 @@ It computes both step-wise rewards (after each intervention) and final rewards
 Author: Yazz Warsame
 """
 
+# Direction tokens that start a shift action (e.g., 'left,0.005')
+_SHIFT_DIRECTIONS = frozenset(('left', 'right', 'forward', 'back'))
+
+
 class RewardShaper:
     """Computes rewards for intervention sequences.
     
@@ -18,6 +22,8 @@ class RewardShaper:
         goal: Set of goal symbolic relationships to achieve.
         shift_bonus: Reward bonus for each shift intervention.
         depth_penalty: Penalty factor per intervention (encourages shorter sequences).
+        predicate_bits: Dictionary mapping each goal predicate to a bit index.
+        goal_mask: Integer bitmask of the goal predicates (see mask()).
     """
     
     def __init__(self, goal_symbolic_set, 
@@ -33,6 +39,34 @@ class RewardShaper:
         self.goal = goal_symbolic_set
         self.shift_bonus = shift_bonus
         self.depth_penalty = depth_penalty
+        
+        # Only goal predicates affect the reward, so only they get a bit
+        self.predicate_bits = {rel: i for i, rel in enumerate(sorted(self.goal))}
+        self.goal_mask = self.mask(self.goal)
+        
+        # Goal size is fixed, so final rewards multiply by its inverse
+        self._goal_size = len(self.goal)
+        self._inv_goal_size = 1.0 / self._goal_size if self._goal_size else 0.0
+
+    def mask(self, relationships):
+        """Encode a set of relationships as an integer bitmask.
+        
+        Relationships that are not goal predicates are dropped, as they never
+        contribute to the reward.
+        
+        Args:
+            relationships: Iterable of relationship strings (e.g., {'On(2,1)'}).
+            
+        Returns:
+            Integer with bit predicate_bits[rel] set for each goal relationship.
+        """
+        bits = self.predicate_bits
+        result = 0
+        for rel in relationships:
+            bit = bits.get(rel)
+            if bit is not None:
+                result |= 1 << bit
+        return result
 
     def step_reward(self, prev_rels, curr_rels, action):
         """Compute immediate reward after applying one intervention.
@@ -41,8 +75,10 @@ class RewardShaper:
         Can reward based on action type or changes in relationships.
         
         Args:
-            prev_rels: Symbolic relationships before the intervention.
-            curr_rels: Symbolic relationships after the intervention.
+            prev_rels: Symbolic relationships before the intervention (a set,
+                or a bitmask from mask()).
+            curr_rels: Symbolic relationships after the intervention, in the
+                same encoding as prev_rels.
             action: The action string (e.g., 'left,0.005', 'pick-top').
             
         Returns:
@@ -51,7 +87,7 @@ class RewardShaper:
         reward = 0.0
         
         # Give credit for shift interventions (Scenario 1)
-        if any(d in action for d in ['left', 'right', 'forward', 'back']):
+        if action.partition(',')[0] in _SHIFT_DIRECTIONS:
             reward += self.shift_bonus
         
         # Give credit for other intervention types (Scenarios 2/3)
@@ -79,14 +115,31 @@ class RewardShaper:
             Final reward score (higher is better).
         """
         # Base reward: fraction of goal predicates achieved
-        if len(self.goal) == 0:
+        if not self._goal_size:
             base = 1.0
         else:
             achieved = len(final_rels & self.goal)
-            total = len(self.goal)
-            base = achieved / total
+            base = achieved * self._inv_goal_size
         
         # Penalty for intervention depth (encourages shorter sequences)
         penalty = self.depth_penalty * len(interventions)
         
-        return base - penalty
\ No newline at end of file
+        return base - penalty
+
+    def final_reward_mask(self, final_mask, n_interventions):
+        """Compute final_reward() for relationships encoded with mask().
+        
+        Args:
+            final_mask: Bitmask of the final relationships.
+            n_interventions: Number of interventions applied.
+            
+        Returns:
+            Final reward score (higher is better).
+        """
+        # Base reward: fraction of goal predicates achieved
+        if not self._goal_size:
+            base = 1.0
+        else:
+            base = (final_mask & self.goal_mask).bit_count() * self._inv_goal_size
+        
+        return base - self.depth_penalty * n_interventions
\ No newline at end of file
@@ -7,8 +7,47 @@ relationships from geometric configurations.
 Author: Yazz Warsame
 """
 
-import copy
 import math
+from enum import IntEnum
+from types import MappingProxyType
+
+
+class Direction(IntEnum):
+    """Shift directions in the world frame."""
+    
+    LEFT = 0
+    RIGHT = 1
+    FORWARD = 2
+    BACK = 3
+
+
+# Indexed by Direction: axis moved by the shift and sign of the move
+_AXIS = (0, 0, 1, 1)
+_SIGN = (-1.0, 1.0, 1.0, -1.0)
+
+# Direction name or member -> Direction
+_DIRECTION_LOOKUP = {d.name.lower(): d for d in Direction}
+_DIRECTION_LOOKUP.update({d: d for d in Direction})
+
+
+def _parse_on(relationship):
+    """Parse an 'On(A,B)' relationship string into its two object names.
+    
+    Args:
+        relationship: Relationship string (e.g., 'On(2,1)').
+        
+    Returns:
+        Tuple (A, B) of stripped object names, or None if the string is not a
+        two-argument 'On' relationship.
+    """
+    if not relationship.startswith('On('):
+        return None
+    
+    parts = relationship[3:-1].split(',')
+    if len(parts) != 2:
+        return None
+    
+    return parts[0].strip(), parts[1].strip()
 
 
 class StateManager:
@@ -20,26 +59,133 @@ class StateManager:
     
     Attributes:
         objects: Dictionary mapping object names to [x, y, z] positions.
-        relationships: Set of current symbolic relationships (e.g., 'On(2,1)').
+        relationships: Frozenset of the symbolic relationships tracked (e.g.,
+            'On(2,1)'); assign a new collection to change them.
         alignment_threshold: Distance threshold for considering objects aligned (meters).
         initial_objects: Copy of initial object positions for reference.
     """
     
-    def __init__(self, initial_state, alignment_threshold):
+    __slots__ = ('objects', 'initial_objects', '_relationships', 'alignment_threshold',
+                 'intervened_objects', '_names', '_ids', '_rows', '_parsed_rels',
+                 '_critical_rels', '_rel_rows', '_rel_always', '_mask_plan',
+                 '_cached_rels', '_cached_mask')
+    
+    def __init__(self, initial_state, alignment_threshold, *, owns_state=False):
         """Initialize the state manager with an initial state.
         
         Args:
             initial_state: Dictionary containing 'objects' and 'relationships' keys.
             alignment_threshold: Maximum distance (in meters) between objects to
                                 maintain alignment. Default: 0.05m (5cm).
+            owns_state: If True, the caller hands initial_state over (e.g. it was
+                        just loaded from JSON) and its 'objects' dictionary and
+                        position lists are used directly instead of copied. The
+                        caller must not use them afterwards. Default: False.
         """
-        self.objects = copy.deepcopy(initial_state.get('objects', {}))
-        self.initial_objects = copy.deepcopy(self.objects)
-        self.relationships = set(initial_state.get('relationships', []))
+        objects = initial_state.get('objects', {})
+        if owns_state:
+            self.objects = objects
+        else:
+            # Positions are flat [x, y, z] lists, so a per-row copy is a deep copy
+            self.objects = {name: list(pos) for name, pos in objects.items()}
+        self.initial_objects = {name: list(pos) for name, pos in self.objects.items()}
+        self._relationships = frozenset(initial_state.get('relationships', []))
         self.alignment_threshold = alignment_threshold
         
         # Track which objects have been intervened on
         self.intervened_objects = set()
+        
+        self._index_objects()
+        self._resolve_relationships()
+    
+    @property
+    def relationships(self):
+        """Frozenset of the symbolic relationships tracked by this manager."""
+        return self._relationships
+    
+    @relationships.setter
+    def relationships(self, relationships):
+        self._relationships = frozenset(relationships)
+        self._resolve_relationships()
+    
+    def _sync_objects(self):
+        """Re-index objects if entries were added to or removed from self.objects."""
+        if self.objects.keys() != self._ids.keys():
+            self._index_objects()
+            self._resolve_relationships()
+    
+    def _index_objects(self):
+        """Assign dense integer ids to objects, in insertion order.
+        
+        The id indexes both self._names and self._rows, where each row is the
+        same position list stored in self.objects.
+        """
+        self._names = list(self.objects)
+        self._ids = {name: i for i, name in enumerate(self._names)}
+        self._rows = [self.objects[name] for name in self._names]
+    
+    def _resolve_relationships(self):
+        """Parse relationships once and split them by how they are checked.
+        
+        self._parsed_rels maps each relationship to its parsed (A, B) pair, or
+        None if it is not an 'On' relationship, and self._critical_rels holds
+        the result of get_critical_relationships(). Each 'On(A,B)' relationship
+        between two known objects is stored in self._rel_rows as
+        (relationship, row_a, row_b), where the rows are the position lists of
+        self._rows; every other relationship holds unconditionally (see
+        _check_relationship_holds) and is stored in self._rel_always. Called
+        by the relationships setter and by _sync_objects().
+        """
+        rows = self._rows
+        ids = self._ids
+        self._parsed_rels = {rel: _parse_on(rel) for rel in self._relationships}
+        self._rel_rows = []
+        self._rel_always = []
+        self._mask_plan = None
+        self._cached_rels = self._cached_mask = None
+        
+        # Stack relationships between numbered blocks (like '1', '2', '3', '4')
+        self._critical_rels = frozenset(
+            rel for rel, pair in self._parsed_rels.items()
+            if pair is not None and pair[0].isdigit() and (pair[1].isdigit() or pair[1] == '0'))
+        
+        for rel, pair in self._parsed_rels.items():
+            if pair is not None and pair[0] in ids and pair[1] in ids:
+                self._rel_rows.append((rel, rows[ids[pair[0]]], rows[ids[pair[1]]]))
+            else:
+                self._rel_always.append(rel)
+    
+    def object_id(self, obj):
+        """Get the integer id of an object for use with apply_shift_by_id.
+        
+        Ids remain valid until objects are removed from self.objects.
+        
+        Args:
+            obj: Name of the object.
+            
+        Returns:
+            Integer id if the object exists, None otherwise.
+        """
+        return self._ids.get(obj)
+    
+    def apply_shift_by_id(self, oid, direction, magnitude):
+        """Apply a directional shift to an object identified by its integer id.
+        
+        Same as apply_shift, but skips the name lookup and direction validation.
+        
+        Args:
+            oid: Object id returned by object_id().
+            direction: Direction member to shift along.
+            magnitude: Distance to shift in meters.
+            
+        Returns:
+            True once the shift has been applied.
+        """
+        self._rows[oid][_AXIS[direction]] += _SIGN[direction] * magnitude
+        self.intervened_objects.add(self._names[oid])
+        self._cached_rels = self._cached_mask = None
+        
+        return True
     
     def apply_shift(self, obj, direction, magnitude) :
         """Apply a directional shift to an object's position.
@@ -49,41 +195,29 @@ class StateManager:
         
         Args:
             obj: Name of the object to shift (e.g., '1', '2', '3').
-            direction: Direction to shift ('left', 'right', 'forward', 'back').
+            direction: Direction to shift, either a Direction member or its
+                       name ('left', 'right', 'forward', 'back').
             magnitude: Distance to shift in meters.
             
         Returns:
             True if shift was successfully applied, False if object not found.
         """
-        if obj not in self.objects:
+        position = self.objects.get(obj)
+        if position is None:
             print(f"[StateManager] Warning: Object '{obj}' not found in state")
             return False
         
-        # Direction vectors (x, y, z)
-        direction_vectors = {
-            'left': (-magnitude, 0, 0),
-            'right': (magnitude, 0, 0),
-            'forward': (0, magnitude, 0),
-            'back': (0, -magnitude, 0)
-        }
-        
-        if direction not in direction_vectors:
+        resolved = _DIRECTION_LOOKUP.get(direction)
+        if resolved is None:
             print(f"[StateManager] Warning: Unknown direction '{direction}'")
             return False
         
-        # Get current position
-        current_pos = self.objects[obj]
-        dx, dy, dz = direction_vectors[direction]
-        
-        # Update position
-        self.objects[obj] = [
-            current_pos[0] + dx,
-            current_pos[1] + dy,
-            current_pos[2] + dz
-        ]
+        # Update the single affected coordinate in place
+        position[_AXIS[resolved]] += _SIGN[resolved] * magnitude
         
         # Mark as intervened
         self.intervened_objects.add(obj)
+        self._cached_rels = self._cached_mask = None
         
         return True
     
@@ -94,17 +228,88 @@ class StateManager:
         positions. Two objects maintain an 'On' relationship if they are
         geometrically aligned (within threshold).
         
+        The result is cached until the next shift, restore() or
+        reset_to_initial(), so positions must not be edited directly in
+        between.
+        
         Returns:
             Set of symbolic relationship strings (e.g., {'On(2,1)', 'On(3,2)'}).
         """
-        current_relationships = set()
+        return set(self._holding_relationships())
+    
+    def _holding_relationships(self):
+        """Implementation of get_relationships() returning the cached frozenset."""
+        self._sync_objects()
+        threshold = self.alignment_threshold
+        cached = self._cached_rels
+        if cached is not None and cached[0] == threshold:
+            return cached[1]
+        
+        current_relationships = set(self._rel_always)
         
         # Check each original relationship to see if it still holds
-        for rel in self.relationships:
-            if self._check_relationship_holds(rel):
+        for rel, pos_a, pos_b in self._rel_rows:
+            if abs(pos_a[0] - pos_b[0]) < threshold and abs(pos_a[1] - pos_b[1]) < threshold:
                 current_relationships.add(rel)
         
-        return current_relationships
+        holding = frozenset(current_relationships)
+        self._cached_rels = (threshold, holding)
+        return holding
+    
+    def get_relationships_mask(self, predicate_bits):
+        """Infer current relationships as an integer bitmask.
+        
+        Equivalent to encoding get_relationships() with predicate_bits, but
+        relationships without a bit are never checked. The lookups are done
+        once per predicate_bits dictionary and reused on later calls with the
+        same dictionary, so it must not be mutated in between. Like
+        get_relationships(), the result is cached until the state changes.
+        
+        Args:
+            predicate_bits: Dictionary mapping relationship strings to bit
+                indices (e.g., RewardShaper.predicate_bits).
+            
+        Returns:
+            Integer with the bit of each holding relationship set.
+        """
+        self._sync_objects()
+        threshold = self.alignment_threshold
+        cached = self._cached_mask
+        if cached is not None and cached[0] is predicate_bits and cached[1] == threshold:
+            return cached[2]
+        
+        plan = self._mask_plan
+        if plan is None or plan[0] is not predicate_bits:
+            plan = self._mask_plan = self._plan_mask(predicate_bits)
+        
+        _, mask, checks = plan
+        for bit, pos_a, pos_b in checks:
+            if abs(pos_a[0] - pos_b[0]) < threshold and abs(pos_a[1] - pos_b[1]) < threshold:
+                mask |= bit
+        
+        self._cached_mask = (predicate_bits, threshold, mask)
+        return mask
+    
+    def _plan_mask(self, predicate_bits):
+        """Precompute the work done by get_relationships_mask(predicate_bits).
+        
+        Args:
+            predicate_bits: Dictionary mapping relationship strings to bit indices.
+            
+        Returns:
+            Tuple of (predicate_bits, always_mask, checks), where always_mask has
+            the bits of relationships that always hold and checks lists
+            (bit_value, row_a, row_b) for each relationship to test geometrically.
+        """
+        always_mask = 0
+        for rel in self._rel_always:
+            bit = predicate_bits.get(rel)
+            if bit is not None:
+                always_mask |= 1 << bit
+        
+        checks = [(1 << predicate_bits[rel], pos_a, pos_b)
+                  for rel, pos_a, pos_b in self._rel_rows if rel in predicate_bits]
+        return predicate_bits, always_mask, checks
     
     def _check_relationship_holds(self, relationship):
         """Check if a symbolic relationship still holds geometrically.
@@ -118,18 +323,17 @@ class StateManager:
         Returns:
             True if the relationship still holds, False otherwise.
         """
-        # Parse relationship string: 'On(2,1)' -> ('On', '2', '1')
-        if not relationship.startswith('On('):
-            # Handle non-On relationships (e.g., 'On(X, Table)', 'Obstruct')
-            return True  # Assume they hold for now
-        
-        # Extract objects from 'On(A,B)'
-        parts = relationship[3:-1].split(',')  # Remove 'On(' and ')', split by ','
-        if len(parts) != 2:
-            return True  # Can't parse, assume it holds
-        
-        obj_a = parts[0].strip()
-        obj_b = parts[1].strip()
+        # Parsed once per relationship by _resolve_relationships()
+        pair = self._parsed_rels.get(relationship)
+        if pair is None:
+            if relationship in self._parsed_rels:
+                # Non-On or unparseable relationship, assume it holds
+                return True
+            pair = _parse_on(relationship)
+            if pair is None:
+                return True
+        
+        obj_a, obj_b = pair
         
         # Check if both objects exist
         if obj_a not in self.objects or obj_b not in self.objects:
@@ -182,21 +386,54 @@ class StateManager:
         """
         return not self.check_alignment(obj, reference)
     
+    def count_aligned(self, objs, reference):
+        """Count how many objects are aligned with a reference object.
+        
+        Equivalent to counting the objects for which check_alignment(obj,
+        reference) is True, in a single pass that reads the reference
+        position once.
+        
+        Args:
+            objs: Iterable of object names to check.
+            reference: Name of the reference object (typically the base '0').
+            
+        Returns:
+            Number of objects in objs aligned with the reference.
+        """
+        objects = self.objects
+        ref_pos = objects.get(reference)
+        if ref_pos is None:
+            return 0
+        
+        ref_x, ref_y = ref_pos[0], ref_pos[1]
+        threshold = self.alignment_threshold
+        count = 0
+        
+        for obj in objs:
+            pos = objects.get(obj)
+            if pos is not None and abs(pos[0] - ref_x) < threshold and abs(pos[1] - ref_y) < threshold:
+                count += 1
+        
+        return count
+    
     def get_alignment_score(self, goal_relationships):
         """Compute alignment score as fraction of goal relationships maintained.
         
+        Equivalent to len(get_relationships() & goal_relationships) divided by
+        the number of goal relationships.
+        
         Args:
             goal_relationships: Set of desired symbolic relationships.
             
         Returns:
             Score between 0 and 1, where 1 means all relationships maintained.
         """
-        current_rels = self.get_relationships()
-        
         if not goal_relationships:
             return 1.0
         
-        maintained = len(current_rels & goal_relationships)
+        # Only goal relationships can count, so only those are checked
+        check = self._check_relationship_holds
+        maintained = sum(1 for rel in self.relationships.intersection(goal_relationships) if check(rel))
         total = len(goal_relationships)
         
         return maintained / total
@@ -212,22 +449,68 @@ class StateManager:
         """
         return self.objects.get(obj, None)
     
-    def get_state_snapshot(self):
+    def get_state_snapshot(self, *, copy=True):
         """Get a complete snapshot of the current state.
         
+        Args:
+            copy: If True, the snapshot owns copies of the positions and lists
+                  of the relationships and intervened objects. If False, it
+                  holds a read-only live view of self.objects (whose position
+                  lists must not be mutated) and frozensets, so no positions
+                  are copied; use it for snapshots that are only read before
+                  the state changes. Default: True.
+        
         Returns:
-            Dictionary containing 'objects' and 'relationships'.
+            Dictionary containing 'objects', 'relationships' and
+            'intervened_objects'.
         """
+        if not copy:
+            return {
+                'objects': MappingProxyType(self.objects),
+                'relationships': self._holding_relationships(),
+                'intervened_objects': frozenset(self.intervened_objects)
+            }
+        
         return {
-            'objects': copy.deepcopy(self.objects),
-            'relationships': list(self.get_relationships()),
+            'objects': {name: list(pos) for name, pos in self.objects.items()},
+            'relationships': list(self._holding_relationships()),
             'intervened_objects': list(self.intervened_objects)
         }
     
+    def snapshot(self):
+        """Capture the current object positions for a later restore().
+        
+        Returns:
+            Tuple of (positions, intervened), where positions holds one
+            position tuple per object in id order and intervened is a
+            frozenset of the intervened objects.
+        """
+        return tuple(tuple(row) for row in self._rows), frozenset(self.intervened_objects)
+    
+    def restore(self, snapshot):
+        """Restore the state captured by snapshot(), in place.
+        
+        Much cheaper than reset_to_initial() as no dictionary lookups are
+        needed. The snapshot must come from this manager or one with the same
+        objects.
+        
+        Args:
+            snapshot: Value returned by snapshot().
+        """
+        positions, intervened = snapshot
+        for row, pos in zip(self._rows, positions):
+            row[:] = pos
+        self.intervened_objects.clear()
+        self.intervened_objects.update(intervened)
+        self._cached_rels = self._cached_mask = None
+    
     def reset_to_initial(self) -> None:
         """Reset state to initial configuration."""
-        self.objects = copy.deepcopy(self.initial_objects)
+        # Copy in place so object ids and their position rows stay valid
+        for name, pos in self.objects.items():
+            pos[:] = self.initial_objects[name]
         self.intervened_objects.clear()
+        self._cached_rels = self._cached_mask = None
     
     def compute_displacement(self, obj):
         """Compute total displacement of an object from its initial position.
@@ -244,36 +527,39 @@ class StateManager:
         current = self.objects[obj]
         initial = self.initial_objects[obj]
         
-        dx = current[0] - initial[0]
-        dy = current[1] - initial[1]
-        dz = current[2] - initial[2]
+        return math.hypot(current[0] - initial[0], current[1] - initial[1], current[2] - initial[2])
+    
+    def compute_all_displacements(self):
+        """Compute the displacement of every object from its initial position.
+        
+        Equivalent to calling compute_displacement() for each object, in a
+        single pass over the position rows.
+        
+        Returns:
+            Dictionary mapping object names to Euclidean distances from their
+            initial positions.
+        """
+        initial_objects = self.initial_objects
+        displacements = {}
+        
+        for name, current in zip(self._names, self._rows):
+            initial = initial_objects[name]
+            displacements[name] = math.hypot(
+                current[0] - initial[0], current[1] - initial[1], current[2] - initial[2])
         
-        return math.sqrt(dx**2 + dy**2 + dz**2)
+        return displacements
     
     def get_critical_relationships(self):
         """Get the subset of critical 'On' relationships that form the stack.
         
         For a stack of blocks On(1,0), On(2,1), On(3,2), On(4,3), this returns
-        all 'On' relationships that involve numbered blocks.
+        all 'On' relationships that involve numbered blocks. The set is computed
+        once per set of relationships and shared between calls.
         
         Returns:
-            Set of critical relationship strings.
+            Frozenset of critical relationship strings.
         """
-        critical = set()
-        
-        for rel in self.relationships:
-            if rel.startswith('On('):
-                # Parse to check if both are numbered blocks
-                parts = rel[3:-1].split(',')
-                if len(parts) == 2:
-                    obj_a = parts[0].strip()
-                    obj_b = parts[1].strip()
-                    
-                    # Check if both are numbered (like '1', '2', '3', '4')
-                    if obj_a.isdigit() and (obj_b.isdigit() or obj_b == '0'):
-                        critical.add(rel)
-        
-        return critical
+        return self._critical_rels
     
     def __repr__(self):
         """String representation of the state."""
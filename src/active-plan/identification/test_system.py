@@ -17,6 +17,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 from state_manager import StateManager
 from interventions import InterventionApplier
 from reward_shaper import RewardShaper
+from mcts import CausalMCTS, load_scenario
 
 
 def test_state_manager():
@@ -32,8 +33,10 @@ def test_state_manager():
     with open(state_path, 'r') as f:
         initial_state = json.load(f)
     
-    # Create state manager
-    state_mgr = StateManager(initial_state, alignment_threshold=0.05)
+    # Create state manager; the freshly loaded state is not used again
+    state_mgr = StateManager(initial_state, alignment_threshold=0.05, owns_state=True)
+    assert state_mgr.objects is initial_state['objects']
+    assert state_mgr.initial_objects['1'] is not state_mgr.objects['1']
     
     print(f"\n{state_mgr}")
     print(f"Initial relationships: {len(state_mgr.relationships)}")
@@ -54,10 +57,97 @@ def test_state_manager():
     misaligned_after = state_mgr.check_misalignment('1', '0')
     print(f"  Object 1 after shift: {'MISALIGNED' if misaligned_after else 'aligned'}")
     
+    # count_aligned must agree with per-object alignment checks
+    objs = ['1', '2', '3', '4', 'missing']
+    expected = sum(state_mgr.check_alignment(obj, '0') for obj in objs)
+    assert state_mgr.count_aligned(objs, '0') == expected
+    print(f"  Objects aligned with 0: {expected}")
+    
+    # Bulk displacements must match the per-object computation
+    displacements = state_mgr.compute_all_displacements()
+    assert displacements == {obj: state_mgr.compute_displacement(obj) for obj in state_mgr.objects}
+    print(f"  Object 1 displacement: {displacements['1']:.3f}m")
+    
+    # Alignment score only checks goal relationships but must match the full set
+    goal = {'On(2, 1)', 'On(1, 0)', 'On(9, 9)'}
+    score = state_mgr.get_alignment_score(goal)
+    assert score == len(state_mgr.get_relationships() & goal) / len(goal)
+    print(f"  Alignment score: {score:.3f}")
+    
+    # Critical relationships are the On() relationships between numbered blocks
+    critical = state_mgr.get_critical_relationships()
+    print(f"  Critical relationships: {sorted(critical)}")
+    assert critical == {'On(1, 0)', 'On(2, 1)', 'On(3, 2)', 'On(4, 3)'}
+    assert state_mgr.get_critical_relationships() is critical
+    
     print("\n✓ StateManager test passed!")
     return state_mgr
 
 
+def test_state_manager_reset():
+    """Test that StateManager.reset_to_initial restores the initial state in place."""
+    print("\n" + "=" * 60)
+    print("Testing StateManager.reset_to_initial")
+    print("=" * 60)
+    
+    config_dir = Path(__file__).parent.parent / 'config'
+    with open(config_dir / 'symbolic_state.json', 'r') as f:
+        initial_state = json.load(f)
+    
+    state_mgr = StateManager(initial_state, alignment_threshold=0.005)
+    position = state_mgr.get_position('1')
+    state_mgr.apply_shift('1', 'forward', 0.01)
+    state_mgr.reset_to_initial()
+    
+    print(f"\n  Object 1 after reset: {state_mgr.get_position('1')}")
+    assert state_mgr.get_position('1') == initial_state['objects']['1']
+    assert state_mgr.get_position('1') is position, "position list should be reused"
+    assert not state_mgr.intervened_objects
+    
+    # snapshot/restore round-trips positions without reallocating them
+    snap = state_mgr.snapshot()
+    state_mgr.apply_shift('1', 'left', 0.02)
+    state_mgr.restore(snap)
+    assert state_mgr.get_position('1') == initial_state['objects']['1']
+    assert state_mgr.get_position('1') is position
+    assert not state_mgr.intervened_objects
+    
+    # State snapshots must not alias the live position lists
+    snapshot = state_mgr.get_state_snapshot()
+    state_mgr.apply_shift('1', 'back', 0.01)
+    assert snapshot['objects']['1'] == initial_state['objects']['1']
+    assert state_mgr.initial_objects['1'] == initial_state['objects']['1']
+    
+    # Read-only snapshots share positions instead of copying them
+    view = state_mgr.get_state_snapshot(copy=False)
+    assert view['objects']['1'] is state_mgr.objects['1']
+    assert view['relationships'] == state_mgr.get_relationships()
+    
+    # Cached relationships must be dropped when the state changes
+    for shift in ('forward', 'forward', 'back', 'back'):
+        state_mgr.get_relationships()
+        state_mgr.apply_shift('2', shift, 0.01)
+        holding = {rel for rel in state_mgr.relationships if state_mgr._check_relationship_holds(rel)}
+        assert state_mgr.get_relationships() == holding
+    
+    # Relationships are read-only; assigning new ones re-resolves them
+    try:
+        state_mgr.relationships.add('On(99, 1)')
+        assert False, "relationships should not be mutable in place"
+    except AttributeError:
+        pass
+    state_mgr.relationships |= {'On(99, 1)'}
+    assert 'On(99, 1)' in state_mgr.get_relationships(), "missing objects always hold"
+    assert state_mgr.get_alignment_score({'On(99, 1)'}) == 1.0
+    
+    # Objects added directly are picked up by the next relationship check
+    state_mgr.objects['99'] = [5.0, 5.0, 0.0]
+    assert 'On(99, 1)' not in state_mgr.get_relationships()
+    assert state_mgr.get_alignment_score({'On(99, 1)'}) == 0.0
+    
+    print("\n✓ StateManager.reset_to_initial test passed!")
+
+
 def test_intervention_applier(state_mgr):
     """Test InterventionApplier functionality."""
     print("\n" + "=" * 60)
@@ -68,7 +158,7 @@ def test_intervention_applier(state_mgr):
     
     # Test parsing
     direction, magnitude = applier.parse_action("left,0.005")
-    print(f"\nParsing 'left,0.005': direction={direction}, magnitude={magnitude}")
+    print(f"\nParsing 'left,0.005': direction={direction!r}, magnitude={magnitude}")
     
     # Test applying an intervention
     print("\nApplying intervention: Object '2', action 'right,0.01'")
@@ -79,6 +169,12 @@ def test_intervention_applier(state_mgr):
     misaligned = state_mgr.check_misalignment('2', '0')
     print(f"  Object 2 alignment: {'MISALIGNED' if misaligned else 'aligned'}")
     
+    # Test applying a batch of interventions
+    print("\nApplying batch: Object '2' 'left,0.01', Object '9' 'pick-top'")
+    results = applier.apply_batch([('2', 'left,0.01'), ('9', 'pick-top')])
+    print(f"  Results: {results}")
+    assert results == [(True, 0.0), (False, 0.0)]
+    
     print("\n✓ InterventionApplier test passed!")
     return applier
 
@@ -104,10 +200,90 @@ def test_reward_shaper():
     final_rew = shaper.final_reward(curr_rels, interventions)
     print(f"Final reward (2 interventions, 2/3 goals): {final_rew:.3f}")
     
+    # Bitmask encoding must give the same final reward
+    mask_rew = shaper.final_reward_mask(shaper.mask(curr_rels), len(interventions))
+    assert mask_rew == final_rew, f"Mask reward {mask_rew} != set reward {final_rew}"
+    print(f"Final reward from bitmask: {mask_rew:.3f}")
+    
     print("\n✓ RewardShaper test passed!")
     return shaper
 
 
+def _make_planner(termination_threshold=99, **kwargs):
+    """Build a seeded CausalMCTS for scenario1."""
+    scenario, initial_state, _ = load_scenario('scenario1')
+    goal = set(scenario['symbolic_goal'])
+    shaping = scenario['reward_shaping']
+    shaper = RewardShaper(goal, shaping['shift_bonus'], shaping['depth_penalty'])
+    return CausalMCTS(initial_state, goal, scenario, shaper, scenario['intv_space'],
+                      scenario['max_rollout_depth'], termination_threshold, 0.5, seed=0, **kwargs)
+
+
+def _walk(node):
+    """Yield node and all of its descendants."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children)
+
+
+def test_mcts_search():
+    """Test that MCTS statistics count each rollout once per tree level."""
+    print("\n" + "=" * 60)
+    print("Testing CausalMCTS search")
+    print("=" * 60)
+    
+    for transpositions in (False, True):
+        planner = _make_planner(transpositions=transpositions)
+        planner.search_resolution(iterations=500)
+        root = planner.root
+        
+        # Every rollout starts below the root, so its visits are split
+        # exactly over its children; deeper nodes also count their own rollout
+        assert root.visits == sum(child.visits for child in root.children) == 500
+        for node in _walk(root):
+            assert sum(child.visits for child in node.children) <= node.visits
+        
+        # Shared state statistics add up the nodes reaching that state
+        if transpositions:
+            per_state = {}
+            for node in _walk(root):
+                if node.shared is not None:
+                    per_state[node.multiset_key] = per_state.get(node.multiset_key, 0) + node.visits
+                    assert node.multiset_key == tuple(sorted(node.path()))
+            assert per_state == {key: shared[0] for key, shared in planner._transposition.items()}
+        print(f"  transpositions={transpositions}: root visits {root.visits}")
+    
+    # Branch-and-bound: nothing is selected once no child can beat the best reward
+    planner._best_reward = float('inf')
+    assert planner._best_child(planner.root) is None
+    
+    print("\n✓ CausalMCTS search test passed!")
+
+
+def test_mcts_leaf_parallel():
+    """Test that leaf-parallel search leaves no in-flight rollouts behind."""
+    print("\n" + "=" * 60)
+    print("Testing CausalMCTS leaf-parallel search")
+    print("=" * 60)
+    
+    scenario = load_scenario('scenario1')[0]
+    for threshold in (scenario['termination_threshold'], 99):
+        planner = _make_planner(termination_threshold=threshold)
+        interventions, iterations = planner.search_leaf_parallel(iterations=300, n_threads=4)
+        
+        # Every evaluated rollout is backpropagated, and virtual loss undone,
+        # also when the search returns early with a solution
+        assert planner.root.visits == len(planner.reward_history)
+        for node in _walk(planner.root):
+            assert node.pending == 0 and node.virtual_loss == 0.0
+        print(f"  threshold={threshold}: solved={planner.solution_found}, "
+              f"rollouts={planner.root.visits}")
+    
+    print("\n✓ CausalMCTS leaf-parallel test passed!")
+
+
 def main():
     """Run all tests."""
     print("\n" + "=" * 60)
@@ -117,8 +293,11 @@ def main():
     try:
         # Test components
         state_mgr = test_state_manager()
+        test_state_manager_reset()
         applier = test_intervention_applier(state_mgr)
         shaper = test_reward_shaper()
+        test_mcts_search()
+        test_mcts_leaf_parallel()
         
         print("\n" + "=" * 60)
         print("✓ ALL TESTS PASSED!")
@@ -7,6 +7,11 @@ Author: Yazz Warsame
 """
 
 import re
+from pathlib import Path
+
+
+# Plan action line; matches format: (word word word ...)
+_ACTION_RE = re.compile(r'\s*\(\s*([a-z-]+)(?:\s+([^)]+))?\s*\)', flags=re.IGNORECASE)
 
 
 class PlanParser:
@@ -30,34 +35,44 @@ class PlanParser:
         Args:
             plan_file: Path to sas_plan file generated by Fast Downward.
             
+        Returns:
+            List of (action_name, parameters) tuples.
+            Example: [('unstack', ['A', 'B']), ('stack-target', ['A', 'B'])]
+        """
+        return self.parse_plan_string(Path(plan_file).read_text())
+    
+    def parse_plan_string(self, plan_text):
+        """Parse the contents of a Fast Downward plan file.
+        
+        Args:
+            plan_text: Plan text, one action per line.
+            
         Returns:
             List of (action_name, parameters) tuples.
             Example: [('unstack', ['A', 'B']), ('stack-target', ['A', 'B'])]
         """
         actions = []
         
-        with open(plan_file, 'r') as f:
-            for line in f:
-                line = line.strip()
+        for line in plan_text.split('\n'):
+            line = line.strip()
+            
+            # Skip empty lines and comments
+            if not line or line.startswith(';'):
+                continue
+            
+            # Parse action: (action-name param1 param2 ...)
+            m = _ACTION_RE.match(line)
+            if m:
+                action_name = m.group(1)
+                params_str = m.group(2) if m.group(2) else ""
+                
+                # Split parameters
+                params = params_str.split() if params_str else []
                 
-                # Skip empty lines and comments
-                if not line or line.startswith(';'):
-                    continue
+                # Normalize parameter names (convert to uppercase)
+                params = [p.upper() for p in params]
                 
-                # Parse action: (action-name param1 param2 ...)
-                # Match format: (word word word ...)
-                m = re.match(r'\s*\(\s*([a-z-]+)(?:\s+([^)]+))?\s*\)', line, flags=re.IGNORECASE)
-                if m:
-                    action_name = m.group(1)
-                    params_str = m.group(2) if m.group(2) else ""
-                    
-                    # Split parameters
-                    params = params_str.split() if params_str else []
-                    
-                    # Normalize parameter names (convert to uppercase)
-                    params = [p.upper() for p in params]
-                    
-                    actions.append((action_name, params))
+                actions.append((action_name, params))
         
         return actions
     
@@ -6,17 +6,131 @@ from MCTS results and running Fast Downward to produce action sequences.
 Author: Yazz Warsame
 """
 
+import hashlib
 import json
+import logging
+import multiprocessing
+import os
+import shutil
 import sys
 import subprocess
+from functools import lru_cache
 from pathlib import Path
-from pddl_builder import PDDLBuilder
+from pddl_builder import generate_problem
 from plan_parser import PlanParser
 
+try:
+    import orjson
+except ImportError:  # Optional faster JSON backend; fall back to json
+    orjson = None
+
+
+log = logging.getLogger(__name__)
+
+# Fast Downward search configuration used for recovery problems
+FD_SEARCH = "astar(lmcut())"
+
+# Directory of this module, and the recovery domain it plans in
+_RECOVERY_DIR = Path(__file__).resolve().parent
+DOMAIN_PATH = _RECOVERY_DIR / 'domains' / 'domain_s1.pddl'
+
+# fast-downward.py from the fixed install locations, resolved once at import:
+# sibling to the recovery directory (recovery/../downward), then inside it.
+# None if Fast Downward is in neither; _find_fd_script() then also tries the
+# work directory and reports the searched locations
+FD_SCRIPT = next(
+    (script for script in (
+        _RECOVERY_DIR.parent / 'downward' / 'fast-downward.py',
+        _RECOVERY_DIR / 'downward' / 'fast-downward.py',
+    ) if script.exists()),
+    None,
+)
+
+# Bytes of Fast Downward's log and stderr shown when it fails
+_FAILURE_TAIL_BYTES = 8192
+
+# Plan parser shared by all calls; it holds no per-plan state
+_PARSER = PlanParser()
+
+
+@lru_cache(maxsize=32)
+def _read_json(path_str, mtime_ns):
+    """Parse a JSON file; memoized on its path and modification time."""
+    # Read the whole file at once and parse the bytes in a single call
+    data = Path(path_str).read_bytes()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps_json(obj):
+    """Encode obj as JSON indented by two spaces.
+    
+    Uses orjson when it is installed; the output matches json.dumps(indent=2)
+    for the ASCII plans written here.
+    
+    Args:
+        obj: JSON-serializable value.
+        
+    Returns:
+        Encoded JSON as str.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+
+def _dump_json_array(items, path):
+    """Write an iterable to path as a JSON array indented by two spaces.
+    
+    Items are encoded and written one at a time, so they need not be
+    collected into a list first. The output matches json.dump(list(items),
+    path, indent=2).
+    
+    Args:
+        items: Iterable of JSON-serializable values.
+        path: Destination file path.
+    """
+    with open(path, 'w') as f:
+        f.write("[")
+        empty = True
+        for item in items:
+            # Nest each encoded item one level into the array
+            f.write("\n  " if empty else ",\n  ")
+            f.write(_dumps_json(item).replace("\n", "\n  "))
+            empty = False
+        f.write("]" if empty else "\n]")
+
+
+def _load_json(path):
+    """Load a JSON file, reusing the parsed result while the file is unchanged.
+    
+    Args:
+        path: Path to the JSON file.
+        
+    Returns:
+        Parsed JSON value. It is shared between calls and must not be mutated.
+        
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    path_str = str(path)
+    return _read_json(path_str, os.stat(path_str).st_mtime_ns)
+
+
+@lru_cache(maxsize=8)
+def _file_digest(path_str, mtime_ns):
+    """Hash a file's contents; memoized on its path and modification time."""
+    return hashlib.blake2b(Path(path_str).read_bytes(), digest_size=16).digest()
+
 
 def load_scenario_data(scenario_name):
     """Load all necessary files for recovery planning.
     
+    Parsed files are cached until they are modified, so repeated calls do
+    not touch the disk beyond a stat() per file. The returned objects are
+    shared between calls and must not be mutated.
+    
     Args:
         scenario_name: Name of scenario (e.g., 'scenario1').
         
@@ -30,25 +144,22 @@ def load_scenario_data(scenario_name):
         FileNotFoundError: If any required file is missing.
     """
     # Get paths relative to this file
-    base_dir = Path(__file__).parent.parent.parent
+    base_dir = _RECOVERY_DIR.parent.parent
     config_dir = base_dir / 'active-plan' / 'config'
     results_dir = base_dir / 'active-plan' / 'identification'
     
     # Load current state
     state_path = config_dir / 'symbolic_state.json'
-    with open(state_path, 'r') as f:
-        current_state = json.load(f)
+    current_state = _load_json(state_path)
     
     # Load scenario config to get goal
     scenario_path = config_dir / f'{scenario_name}.json'
-    with open(scenario_path, 'r') as f:
-        scenario_config = json.load(f)
+    scenario_config = _load_json(scenario_path)
     goal_state = scenario_config['symbolic_goal']
     
     # Load MCTS results to identify target objects
     results_path = results_dir / f'results_{scenario_name}.json'
-    with open(results_path, 'r') as f:
-        mcts_results = json.load(f)
+    mcts_results = _load_json(results_path)
     
     return current_state, goal_state, mcts_results
 
@@ -63,118 +174,211 @@ def extract_target_objects(mcts_results):
         mcts_results: Dictionary containing MCTS intervention results.
         
     Returns:
-        List of object IDs (as strings) that need precise placement.
+        List of unique object IDs (as strings) that need precise placement,
+        in the order they are first intervened on.
     """
     interventions = mcts_results.get('interventions', [])
-    # Extract unique object IDs from intervention sequence
-    target_objects = list(set(obj for obj, action in interventions))
+    # Extract unique object IDs from intervention sequence, in first-seen
+    # order so the generated problem (and its plan cache key) is stable
+    target_objects = list(dict.fromkeys(obj for obj, _ in interventions))
     return target_objects
 
 
-def run_fast_downward(domain_path, problem_path, work_dir):
+@lru_cache(maxsize=8)
+def _find_fd_script(work_dir):
+    """Locate fast-downward.py; memoized per work directory.
+    
+    Returns FD_SCRIPT without touching the disk when it was found at import.
+    A failed lookup raises and is therefore not cached, so installing Fast
+    Downward later is picked up by the next call.
+    
+    Args:
+        work_dir: Resolved working directory Path.
+        
+    Returns:
+        Path to fast-downward.py.
+        
+    Raises:
+        FileNotFoundError: If the script is in none of the searched locations.
+    """
+    if FD_SCRIPT is not None:
+        return FD_SCRIPT
+    
+    search_dirs = (
+        # First try: sibling to recovery directory (recovery/../downward)
+        _RECOVERY_DIR.parent / 'downward',
+        # Second try: in work_dir
+        work_dir / 'downward',
+        # Third try: in recovery subdirectory
+        _RECOVERY_DIR / 'downward',
+    )
+    
+    for fd_dir in search_dirs:
+        fd_script = fd_dir / 'fast-downward.py'
+        if fd_script.exists():
+            return fd_script
+    
+    raise FileNotFoundError(
+        "Fast Downward script not found. Searched in:\n"
+        + "\n".join(f"  {fd_dir}" for fd_dir in search_dirs)
+    )
+
+
+def run_fast_downward(domain_path, problem_path, work_dir, plan_name='sas_plan'):
     """Execute Fast Downward planner.
     
     Args:
         domain_path: Path to PDDL domain file.
         problem_path: Path to PDDL problem file.
         work_dir: Working directory where Fast Downward will write output.
+        plan_name: Name of the plan file written in work_dir.
         
     Returns:
-        Path to the generated plan file (sas_plan).
+        Path to the generated plan file (work_dir/plan_name).
         
     Raises:
         RuntimeError: If Fast Downward fails to find a plan.
+        FileNotFoundError: If Fast Downward did not write the plan file.
     """
     work_dir = Path(work_dir).resolve()
     work_dir.mkdir(parents=True, exist_ok=True)
     
-    # Locate fast-downward.py
-    # First try: sibling to recovery directory (recovery/../downward)
-    fd_script = Path(__file__).parent.parent / 'downward' / 'fast-downward.py'
-    
-    if not fd_script.exists():
-        # Second try: in work_dir
-        fd_script = work_dir / 'downward' / 'fast-downward.py'
+    fd_script = _find_fd_script(work_dir)
     
-    if not fd_script.exists():
-        # Third try: in recovery subdirectory
-        fd_script = Path(__file__).parent / 'downward' / 'fast-downward.py'
-    
-    if not fd_script.exists():
-        raise FileNotFoundError(
-            f"Fast Downward script not found. Searched in:\n"
-            f"  {Path(__file__).parent.parent / 'downward'}\n"
-            f"  {work_dir / 'downward'}\n"
-            f"  {Path(__file__).parent / 'downward'}"
-        )
+    # Name the plan file explicitly; FD_SEARCH is not an iterated search, so
+    # Fast Downward writes exactly this file rather than numbered plans. A
+    # plan left over from an earlier run must not be taken for a new one
+    plan_file = work_dir / plan_name
+    plan_file.unlink(missing_ok=True)
     
-    # Build command
+    # Build command (driver options come before the input files)
     cmd = [
         sys.executable,
         str(fd_script),
+        "--plan-file", str(plan_file),
         str(domain_path),
         str(problem_path),
-        "--search", "astar(lmcut())"
+        "--search", FD_SEARCH
     ]
     
-    print(f"\n[planner] Running Fast Downward...")
-    print(f"[planner] Working directory: {work_dir}")
-    
-    # Run planner
-    result = subprocess.run(
-        cmd,
-        cwd=str(work_dir),
-        capture_output=True,
-        text=True
-    )
+    log.info("\n[planner] Running Fast Downward...")
+    log.info("[planner] Working directory: %s", work_dir)
+    
+    # Run planner; its verbose log goes straight to a file instead of being
+    # buffered in memory, and only the (short) stderr is captured
+    log_path = work_dir / 'fd.log'
+    with open(log_path, 'wb') as log_file:
+        result = subprocess.run(
+            cmd,
+            cwd=str(work_dir),
+            stdout=log_file,
+            stderr=subprocess.PIPE
+        )
     
-    # Check for success
+    # Check for success; the output is kept as bytes and only the tail of
+    # the log and of stderr is decoded and shown
     if result.returncode != 0:
-        print(result.stdout)
-        print(result.stderr)
+        print(f"[planner] Fast Downward log: {log_path}")
+        with open(log_path, 'rb') as log_file:
+            log_file.seek(max(0, log_path.stat().st_size - _FAILURE_TAIL_BYTES))
+            log_tail = log_file.read()
+        print(log_tail.decode(errors='replace'), end='')
+        print(result.stderr[-_FAILURE_TAIL_BYTES:].decode(errors='replace'), end='')
         raise RuntimeError("Fast Downward failed to find a plan")
     
-    # Find plan file (Fast Downward writes sas_plan or sas_plan.1, etc.)
-    plan_file = work_dir / 'sas_plan'
     if not plan_file.exists():
-        # Check for numbered plans
-        numbered_plans = list(work_dir.glob('sas_plan.*'))
-        if numbered_plans:
-            # Use the highest numbered plan
-            plan_file = max(numbered_plans, key=lambda p: int(p.suffix[1:]) if p.suffix[1:].isdigit() else 0)
-        else:
-            raise FileNotFoundError("Fast Downward did not produce a plan file")
+        raise FileNotFoundError("Fast Downward did not produce a plan file")
     
     return plan_file
 
 
-def main():
-    """Main entry point for PDDL recovery planning.
+def plan_cache_key(domain_path, problem_path):
+    """Compute the plan cache key of a planning problem.
     
-    Prompts user for scenario selection, generates PDDL problem with target
-    objects identified by MCTS, runs Fast Downward, and displays the plan.
+    The key covers everything Fast Downward sees: the domain and problem
+    files and the search configuration.
+    
+    Args:
+        domain_path: Path to PDDL domain file.
+        problem_path: Path to PDDL problem file.
+        
+    Returns:
+        Hex digest string identifying the problem.
     """
-    print("=" * 60)
-    print("PDDL Recovery Planner")
-    print("=" * 60)
+    # The domain is static, so its fixed-size digest is memoized and only
+    # the problem, which is rewritten every run, is hashed per call
+    domain_str = str(domain_path)
+    domain_digest = _file_digest(domain_str, os.stat(domain_str).st_mtime_ns)
+    
+    digest = hashlib.blake2b(FD_SEARCH.encode(), digest_size=16)
+    digest.update(domain_digest)
+    digest.update(Path(problem_path).read_bytes())
+    return digest.hexdigest()
+
+
+def run_fast_downward_cached(domain_path, problem_path, work_dir, plan_name='sas_plan'):
+    """Execute Fast Downward unless the same problem was already solved.
     
-    # Scenario selection
-    print("\nAvailable scenarios:")
-    print("  1. Scenario 1")
-    print("  2. Scenario 2")
-    print("  3. Scenario 3")
+    Plans are kept in work_dir/plan_cache, named by plan_cache_key(), so an
+    identical recovery request skips the planner subprocess entirely.
+    
+    Args:
+        domain_path: Path to PDDL domain file.
+        problem_path: Path to PDDL problem file.
+        work_dir: Working directory where Fast Downward will write output.
+        plan_name: Name of the plan file written in work_dir on a cache miss.
+        
+    Returns:
+        Path to the plan file, either the cached copy or a fresh plan.
+        
+    Raises:
+        RuntimeError: If Fast Downward fails to find a plan.
+        FileNotFoundError: If Fast Downward did not write the plan file.
+    """
+    cache_dir = Path(work_dir).resolve() / 'plan_cache'
+    cached_plan = cache_dir / f'{plan_cache_key(domain_path, problem_path)}.plan'
+    
+    if cached_plan.exists():
+        log.info("[planner] Reusing cached plan: %s", cached_plan)
+        return cached_plan
+    
+    plan_file = run_fast_downward(domain_path, problem_path, work_dir, plan_name)
     
-    choice = input("\nSelect scenario (1-3, or press Enter for scenario1): ").strip()
+    # Copy then rename, so an interrupted copy is never taken for a plan
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    partial = cached_plan.with_suffix('.partial')
+    shutil.copyfile(plan_file, partial)
+    os.replace(partial, cached_plan)
+    
+    return plan_file
+
+
+# Scenarios offered by main() and planned by run_all_scenarios()
+SCENARIOS = ('scenario1', 'scenario2', 'scenario3')
+
+# main() menu choice -> scenario name
+_SCENARIO_MAP = {
+    '1': 'scenario1',
+    '2': 'scenario2',
+    '3': 'scenario3',
+    '': 'scenario1'
+}
+
+
+def _plan_one(scenario_name, work_dir):
+    """Plan the recovery of one scenario.
     
-    scenario_map = {
-        '1': 'scenario1',
-        '2': 'scenario2',
-        '3': 'scenario3',
-        '': 'scenario1'
-    }
+    Generates the PDDL problem with target objects identified by MCTS, runs
+    Fast Downward, displays the plan and saves it to JSON in work_dir.
     
-    scenario_name = scenario_map.get(choice, 'scenario1')
-    print(f"\nLoading {scenario_name}...")
+    Args:
+        scenario_name: Name of scenario (e.g., 'scenario1').
+        work_dir: Directory for the problem, planner output and saved plan.
+        
+    Returns:
+        List of (action_name, parameters) tuples, or None if planning failed.
+    """
+    log.info("\nLoading %s...", scenario_name)
     
     # Load data
     try:
@@ -182,49 +386,47 @@ def main():
         target_objects = extract_target_objects(mcts_results)
     except FileNotFoundError as e:
         print(f"Error: {e}")
-        return
+        return None
     
-    print(f"[planner] Loaded MCTS results: {len(target_objects)} objects need correction")
-    print(f"[planner] Target objects: {target_objects}")
+    log.info("[planner] Loaded MCTS results: %d objects need correction", len(target_objects))
+    log.info("[planner] Target objects: %s", target_objects)
     
     # Generate PDDL problem
-    builder = PDDLBuilder()
-    pddl_problem = builder.generate_problem(
+    pddl_problem = generate_problem(
         current_state=current_state,
         goal_state=goal_state,
         target_objects=target_objects
     )
     
     # Set up directories
-    work_dir = Path(__file__).parent / 'fd_output'
+    work_dir = Path(work_dir)
     work_dir.mkdir(parents=True, exist_ok=True)
     
     # Write PDDL files
     problem_path = work_dir / 'problem.pddl'
-    with open(problem_path, 'w') as f:
-        f.write(pddl_problem)
-    print(f"[planner] Wrote problem: {problem_path}")
+    problem_path.write_text(pddl_problem, newline='\n')
+    log.info("[planner] Wrote problem: %s", problem_path)
     
     # Copy or locate domain file
-    domain_path = Path(__file__).parent / 'domains' / 'domain_s1.pddl'
+    domain_path = DOMAIN_PATH
     if not domain_path.exists():
         print(f"Error: Domain file not found at {domain_path}")
-        return
+        return None
     
     # Run Fast Downward
     try:
-        plan_file = run_fast_downward(domain_path, problem_path, work_dir)
-        print(f"[planner] Plan generated: {plan_file}")
+        plan_file = run_fast_downward_cached(
+            domain_path, problem_path, work_dir, plan_name=f'{scenario_name}.plan')
+        log.info("[planner] Plan generated: %s", plan_file)
     except (RuntimeError, FileNotFoundError) as e:
         print(f"Error: {e}")
-        return
+        return None
     
     # Parse and display plan
-    parser = PlanParser()
-    actions = parser.parse_plan_file(plan_file)
+    actions = _PARSER.parse_plan_file(plan_file)
     
     print("\n" + "=" * 60)
-    print("RECOVERY PLAN")
+    print(f"RECOVERY PLAN ({scenario_name})")
     print("=" * 60)
     
     if not actions:
@@ -236,13 +438,74 @@ def main():
     
     # Save plan to JSON
     plan_json_path = work_dir / f'plan_{scenario_name}.json'
-    with open(plan_json_path, 'w') as f:
-        json.dump(
-            [{'action': name, 'args': params} for name, params in actions],
-            f,
-            indent=2
-        )
+    _dump_json_array(({'action': name, 'args': params} for name, params in actions), plan_json_path)
     print(f"\nPlan saved to: {plan_json_path}")
+    
+    return actions
+
+
+def _plan_scenario(scenario_name):
+    """Plan one scenario in its own fd_output subdirectory (pool worker)."""
+    return _plan_one(scenario_name, _RECOVERY_DIR / 'fd_output' / scenario_name)
+
+
+def run_all_scenarios(scenarios=SCENARIOS):
+    """Plan the recovery of several scenarios in parallel.
+    
+    Each scenario is planned in its own process, with its own working
+    directory fd_output/<scenario_name>/ so that the Fast Downward runs do
+    not overwrite each other's output.
+    
+    Args:
+        scenarios: Names of the scenarios to plan.
+        
+    Returns:
+        Dictionary mapping scenario name -> list of (action_name, parameters)
+        tuples, or None for scenarios whose planning failed.
+    """
+    scenarios = list(scenarios)
+    if not scenarios:
+        return {}
+    
+    # Workers only report errors and plans, so their status lines do not
+    # interleave on the shared stdout
+    processes = min(len(scenarios), os.cpu_count() or 1)
+    with multiprocessing.Pool(processes, initializer=log.setLevel, initargs=(logging.WARNING,)) as pool:
+        plans = pool.map(_plan_scenario, scenarios)
+    
+    return dict(zip(scenarios, plans))
+
+
+def main():
+    """Main entry point for PDDL recovery planning.
+    
+    Prompts user for scenario selection, generates PDDL problem with target
+    objects identified by MCTS, runs Fast Downward, and displays the plan.
+    Selecting 'a' plans all scenarios in parallel (see run_all_scenarios).
+    Status lines are logged; set PLANNER_VERBOSE=0 to hide them.
+    """
+    verbose = os.environ.get('PLANNER_VERBOSE', '1') != '0'
+    logging.basicConfig(level=logging.INFO if verbose else logging.WARNING, format='%(message)s')
+    
+    print("=" * 60)
+    print("PDDL Recovery Planner")
+    print("=" * 60)
+    
+    # Scenario selection
+    print("\nAvailable scenarios:")
+    print("  1. Scenario 1")
+    print("  2. Scenario 2")
+    print("  3. Scenario 3")
+    print("  a. All scenarios")
+    
+    choice = input("\nSelect scenario (1-3, a for all, or press Enter for scenario1): ").strip()
+    
+    if choice.lower() == 'a':
+        run_all_scenarios()
+        return
+    
+    scenario_name = _SCENARIO_MAP.get(choice, 'scenario1')
+    _plan_one(scenario_name, _RECOVERY_DIR / 'fd_output')
 
 
 if __name__ == '__main__':
@@ -6,8 +6,44 @@ plan parsing, and the overall recovery pipeline work correctly.
 Author: Yazz Warsame
 """
 
+import io
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from pddl_builder import PDDLBuilder
 from plan_parser import PlanParser
+import planner
+from planner import load_scenario_data, plan_cache_key
+
+# Builder and parser shared by the tests; neither holds per-call state
+_BUILDER = PDDLBuilder()
+_PARSER = PlanParser()
+
+
+class _ThreadStdout:
+    """sys.stdout stand-in that sends each thread's output to its own buffer.
+    
+    contextlib.redirect_stdout swaps sys.stdout for the whole process, so it
+    cannot separate the output of tests running concurrently. Threads that
+    have not set a buffer write to the wrapped stream.
+    """
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+    
+    def capture(self, buffer):
+        """Send the calling thread's output to buffer (None to stop)."""
+        self._local.buffer = buffer
+    
+    def write(self, text):
+        return (getattr(self._local, 'buffer', None) or self._stream).write(text)
+    
+    def flush(self):
+        (getattr(self._local, 'buffer', None) or self._stream).flush()
 
 
 def test_normalize_names():
@@ -15,8 +51,6 @@ def test_normalize_names():
     print("\nTest: Block name normalization")
     print("-" * 40)
     
-    builder = PDDLBuilder()
-    
     test_cases = [
         ('1', 'A'),
         ('2', 'B'),
@@ -32,7 +66,7 @@ def test_normalize_names():
     
     passed = 0
     for input_name, expected in test_cases:
-        result = builder.normalize_name(input_name)
+        result = _BUILDER.normalize_name(input_name)
         status = "PASS" if result == expected else "FAIL"
         print(f"  {status} '{input_name}' -> '{result}' (expected '{expected}')")
         if result == expected:
@@ -47,8 +81,6 @@ def test_parse_relationships():
     print("\nTest: Relationship parsing")
     print("-" * 40)
     
-    builder = PDDLBuilder()
-    
     # Test case: simple stack
     state = {
         'relationships': [
@@ -58,7 +90,7 @@ def test_parse_relationships():
         ]
     }
     
-    on_pairs, ontable, clear = builder.parse_relationships(state)
+    on_pairs, ontable, clear = _BUILDER.parse_relationships(state)
     
     print(f"  Input relationships: {state['relationships']}")
     print(f"  Parsed On pairs: {on_pairs}")
@@ -74,7 +106,12 @@ def test_parse_relationships():
     ontable_match = ontable == expected_ontable
     clear_match = clear == expected_clear
     
-    success = ontable_match and clear_match
+    # Results are memoized, so mutating one must not affect later calls
+    ontable.add('Z')
+    _, ontable_again, _ = _BUILDER.parse_relationships(state)
+    cache_match = ontable_again == expected_ontable
+    
+    success = ontable_match and clear_match and cache_match
     
     print(f"\n  Status: {'PASS' if success else 'FAIL'}")
     return success
@@ -85,8 +122,6 @@ def test_target_trick():
     print("\nTest: Target Trick in PDDL generation")
     print("-" * 40)
     
-    builder = PDDLBuilder()
-    
     # Current state: B on A, A on table, B is misaligned
     current_state = {
         'relationships': [
@@ -105,7 +140,7 @@ def test_target_trick():
     # MCTS identified object 2 (B) as misaligned
     target_objects = ['2']
     
-    pddl = builder.generate_problem(current_state, goal_state, target_objects)
+    pddl = _BUILDER.generate_problem(current_state, goal_state, target_objects)
     
     print("  Generated PDDL problem:")
     print()
@@ -133,8 +168,6 @@ def test_plan_parsing():
     print("\nTest: Plan file parsing")
     print("-" * 40)
     
-    parser = PlanParser()
-    
     # Create a mock plan file
     plan_content = """; cost = 4 (unit cost)
 (unstack b a)
@@ -144,35 +177,24 @@ def test_plan_parsing():
 ; Plan length: 4 steps
 """
     
-    # Write temporary plan file
-    import tempfile
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.plan', delete=False) as f:
-        f.write(plan_content)
-        temp_path = f.name
+    # Parse the plan
+    actions = _PARSER.parse_plan_string(plan_content)
     
-    try:
-        # Parse the plan
-        actions = parser.parse_plan_file(temp_path)
-        
-        print(f"  Parsed {len(actions)} actions:")
-        for action_name, params in actions:
-            print(f"    {action_name}({', '.join(params)})")
-        
-        # Verify
-        expected_count = 4
-        has_stack_target = any(name == 'stack-target' for name, _ in actions)
-        
-        success = len(actions) == expected_count and has_stack_target
-        
-        print(f"\n  Correct action count: {len(actions) == expected_count}")
-        print(f"  Contains stack-target: {has_stack_target}")
-        print(f"\n  Status: {'PASS' if success else 'FAIL'}")
-        
-        return success
-    finally:
-        # Clean up
-        import os
-        os.unlink(temp_path)
+    print(f"  Parsed {len(actions)} actions:")
+    for action_name, params in actions:
+        print(f"    {action_name}({', '.join(params)})")
+    
+    # Verify
+    expected_count = 4
+    has_stack_target = any(name == 'stack-target' for name, _ in actions)
+    
+    success = len(actions) == expected_count and has_stack_target
+    
+    print(f"\n  Correct action count: {len(actions) == expected_count}")
+    print(f"  Contains stack-target: {has_stack_target}")
+    print(f"\n  Status: {'PASS' if success else 'FAIL'}")
+    
+    return success
 
 
 def test_plan_validation():
@@ -180,15 +202,13 @@ def test_plan_validation():
     print("\nTest: Plan validation")
     print("-" * 40)
     
-    parser = PlanParser()
-    
     # Valid plan
     valid_plan = [
         ('unstack', ['A', 'B']),
         ('stack-target', ['A', 'B'])
     ]
     
-    is_valid, error = parser.validate_plan(valid_plan)
+    is_valid, error = _PARSER.validate_plan(valid_plan)
     print(f"  Valid plan: {'PASS' if is_valid else 'FAIL'}")
     if error:
         print(f"    Error: {error}")
@@ -198,7 +218,7 @@ def test_plan_validation():
         ('unstack', ['A']),  # Should have 2 parameters
     ]
     
-    is_valid, error = parser.validate_plan(invalid_plan)
+    is_valid, error = _PARSER.validate_plan(invalid_plan)
     print(f"  Invalid plan detection: {'PASS' if not is_valid else 'FAIL'}")
     if error:
         print(f"    Expected error: {error}")
@@ -206,6 +226,120 @@ def test_plan_validation():
     return True
 
 
+def test_load_scenario_data():
+    """Test that scenario files are parsed once and then reused."""
+    print("\nTest: Scenario data loading")
+    print("-" * 40)
+    
+    current_state, goal_state, mcts_results = load_scenario_data('scenario1')
+    again = load_scenario_data('scenario1')
+    
+    print(f"  Goal: {goal_state}")
+    print(f"  MCTS interventions: {mcts_results.get('interventions')}")
+    
+    cached = again[0] is current_state and again[2] is mcts_results
+    has_goal = bool(goal_state) and 'relationships' in current_state
+    print(f"  Reused parsed files: {cached}")
+    
+    success = cached and has_goal
+    print(f"\n  Status: {'PASS' if success else 'FAIL'}")
+    return success
+
+
+def test_plan_cache_key():
+    """Test that plan cache keys identify the exact planning problem."""
+    print("\nTest: Plan cache key")
+    print("-" * 40)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        domain_path = os.path.join(tmp, 'domain.pddl')
+        problem_path = os.path.join(tmp, 'problem.pddl')
+        with open(domain_path, 'w') as f:
+            f.write("(define (domain recovery-blocks))")
+        with open(problem_path, 'w') as f:
+            f.write("(define (problem recovery-problem))")
+        
+        key = plan_cache_key(domain_path, problem_path)
+        same = plan_cache_key(domain_path, problem_path) == key
+        
+        with open(problem_path, 'w') as f:
+            f.write("(define (problem other-problem))")
+        changed_key = plan_cache_key(domain_path, problem_path)
+        changed = changed_key != key
+        
+        # The memoized domain digest must follow edits to the domain
+        with open(domain_path, 'w') as f:
+            f.write("(define (domain other-blocks))")
+        stat = os.stat(domain_path)
+        os.utime(domain_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        domain_changed = plan_cache_key(domain_path, problem_path) not in (key, changed_key)
+    
+    print(f"  Key: {key}")
+    print(f"  Stable for the same problem: {same}")
+    print(f"  Changes with the problem: {changed}")
+    print(f"  Changes with the domain: {domain_changed}")
+    
+    success = same and changed and domain_changed
+    print(f"\n  Status: {'PASS' if success else 'FAIL'}")
+    return success
+
+
+def test_fast_downward_failure():
+    """Test that a failing planner run is reported as a RuntimeError."""
+    print("\nTest: Fast Downward failure")
+    print("-" * 40)
+    
+    # Stand-in driver that logs non-UTF-8 output and exits with an error
+    stub = (
+        "import sys\n"
+        "sys.stdout.buffer.write(b'search failed \\xff\\n')\n"
+        "sys.stderr.buffer.write(b'error \\xfe\\n')\n"
+        "sys.exit(12)\n"
+    )
+    
+    fd_script = planner.FD_SCRIPT
+    with tempfile.TemporaryDirectory() as tmp:
+        stub_path = os.path.join(tmp, 'fast-downward.py')
+        with open(stub_path, 'w') as f:
+            f.write(stub)
+        
+        planner.FD_SCRIPT = stub_path
+        try:
+            # Output goes to the captured sys.stdout, which has no bytes buffer
+            planner.run_fast_downward(planner.DOMAIN_PATH, os.path.join(tmp, 'problem.pddl'), tmp)
+            raised = False
+        except RuntimeError:
+            raised = True
+        finally:
+            planner.FD_SCRIPT = fd_script
+    
+    print(f"\n  Raised RuntimeError: {raised}")
+    print(f"\n  Status: {'PASS' if raised else 'FAIL'}")
+    return raised
+
+
+def _run_captured(test_func, stdout):
+    """Run a test with its output captured.
+    
+    Args:
+        test_func: Test function returning True on success.
+        stdout: _ThreadStdout installed as sys.stdout.
+        
+    Returns:
+        Tuple of (test_name, result, output).
+    """
+    buffer = io.StringIO()
+    stdout.capture(buffer)
+    try:
+        result = test_func()
+    except Exception as e:
+        print(f"\n  EXCEPTION: {e}")
+        result = False
+    finally:
+        stdout.capture(None)
+    return test_func.__name__, result, buffer.getvalue()
+
+
 def run_all_tests():
     """Run all integration tests."""
     print("=" * 60)
@@ -218,16 +352,25 @@ def run_all_tests():
         test_target_trick,
         test_plan_parsing,
         test_plan_validation,
+        test_load_scenario_data,
+        test_plan_cache_key,
+        test_fast_downward_failure,
     ]
     
+    # The tests are independent, so run them concurrently and print each
+    # test's captured output in order once all have finished
+    stdout = sys.stdout
+    sys.stdout = capture = _ThreadStdout(stdout)
+    try:
+        with ThreadPoolExecutor(max_workers=len(tests)) as ex:
+            outcomes = list(ex.map(_run_captured, tests, [capture] * len(tests)))
+    finally:
+        sys.stdout = stdout
+    
     results = []
-    for test_func in tests:
-        try:
-            result = test_func()
-            results.append((test_func.__name__, result))
-        except Exception as e:
-            print(f"\n  EXCEPTION: {e}")
-            results.append((test_func.__name__, False))
+    for test_name, result, output in outcomes:
+        print(output, end='')
+        results.append((test_name, result))
     
     # Summary
     print("\n" + "=" * 60)